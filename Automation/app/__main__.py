@@ -1,6 +1,10 @@
 import argparse
+import os
+import signal
 import sys
+import threading
 import traceback
+from queue import Queue
 
 def new_excepthook(type, value, tb):
     # by default, Qt does not seem to output any errors, this prevents that
@@ -8,9 +12,91 @@ def new_excepthook(type, value, tb):
 
 sys.excepthook = new_excepthook
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--no-gui', action='store_true')
+def create_parser():
+    parser = argparse.ArgumentParser(prog="app", description="Search Google and scrape the result links")
+    parser.add_argument('--no-gui', action='store_true', help="run without the GUI, needs a query")
+    parser.add_argument('queries', nargs='*', help="search queries, run headless when given")
+    parser.add_argument('--query-file', help="text or CSV file of search queries")
+    parser.add_argument('--max-queries', type=int, help="queries run in parallel")
+    parser.add_argument('--max-pages', type=int, help="Google result pages read per query")
+    parser.add_argument('--max-results', type=int, help="result links processed per query")
+    parser.add_argument('--main-content', action='store_true', default=None, help="only keep the main content of pages")
+    parser.add_argument('--max-text-length', type=int, help="most characters of text kept per link, 0 keeps all")
+    parser.add_argument('--workers', dest='max_workers', type=int, help="links fetched in parallel")
+    parser.add_argument('--per-host', dest='per_host_limit', type=int, help="links fetched in parallel from one host")
+    parser.add_argument('--browsers', type=int, help="browsers in the pool")
+    parser.add_argument('--pdf-workers', type=int, help="processes extracting PDF tables")
+    parser.add_argument('--pdf-pages', help="PDF pages to extract tables from, e.g. all or 1-3")
+    parser.add_argument('--format', dest='output_format', choices=["excel", "csv", "jsonl", "parquet"], help="output format")
+    parser.add_argument('--output', dest='output_path', help="output file")
+    parser.add_argument('--cache-dir', help="directory of the fetch cache")
+    parser.add_argument('--no-cache', action='store_true', help="do not use the fetch cache")
+    parser.add_argument('--cache-ttl', type=float, help="seconds a cached page is used without revalidation")
+    parser.add_argument('--checkpoint-every', type=int, help="results between two checkpoints of the output")
+    parser.add_argument('--timeout', dest='read_timeout', type=float, help="seconds to wait for a server before a request fails")
+    parser.add_argument('--retries', type=int, help="retries of failed connections and server errors per request")
+    parser.add_argument('--deadline', type=float, help="seconds the run may take, the remaining links are left for --resume")
+    parser.add_argument('--resume', action='store_true', help="skip the links finished by the last run")
+    parser.add_argument('--quiet', action='store_true', help="do not echo the log to stderr")
+    return parser
+
+def print_events(events, quiet, last_stats):
+    # echo the log lines of the run, keep the latest stats
+    while True:
+        event = events.get()
+        if event is None:
+            return
+        kind, payload = event
+        if kind == "log" and not quiet:
+            print(payload, file=sys.stderr, flush=True)
+        elif kind == "progress":
+            last_stats[0] = payload
+
+def run_headless(parser, args):
+    # Qt is never imported on this path
+    from .automation import run_batch, load_queries
+    from .events import format_run_stats
+
+    queries = list(args.queries) + (load_queries(args.query_file) if args.query_file else [])
+    if not queries:
+        parser.error("no search queries given, pass them as arguments or with --query-file")
+
+    # only forward the options that were given, the rest keep the defaults of run_batch
+    options = {name: getattr(args, name) for name in ("max_queries", "max_workers", "per_host_limit", "browsers", "pdf_workers", "pdf_pages", "cache_ttl", "output_format", "output_path", "checkpoint_every", "max_pages", "max_results", "main_content", "max_text_length", "read_timeout", "retries", "deadline")}
+    options = {name: value for name, value in options.items() if value is not None}
+    if args.no_cache:
+        options["cache_path"] = None
+    elif args.cache_dir:
+        os.makedirs(args.cache_dir, exist_ok=True)
+        options["cache_path"] = os.path.join(args.cache_dir, "fetch_cache.sqlite")
+
+    # the first Ctrl+C stops the run after writing the results fetched so far
+    stop = threading.Event()
+    def request_stop(signum, frame):
+        print("Stopping, press Ctrl+C again to quit at once", file=sys.stderr)
+        stop.set()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGINT, request_stop)
+
+    events = Queue()
+    last_stats = [None]
+    printer = threading.Thread(target=print_events, args=(events, args.quiet, last_stats), daemon=True)
+    printer.start()
+    try:
+        run_batch(queries, event_queue=events, resume=args.resume, stop=stop, **options)
+    finally:
+        events.put(None)
+        printer.join()
+        if last_stats[0] is not None:
+            print(format_run_stats(last_stats[0]), file=sys.stderr)
+
+def main(argv=None):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+
+    if args.no_gui or args.queries or args.query_file:
+        run_headless(parser, args)
+        return
 
     from PyQt5.QtWidgets import QApplication
     from .gui import MainWindow
@@ -1,5 +1,4 @@
 # import dependencies
-import pandas as pd
 from selenium import webdriver
 from selenium.common.exceptions import TimeoutException, WebDriverException, NoSuchElementException, InvalidSessionIdException, StaleElementReferenceException, ElementClickInterceptedException
 from selenium.webdriver.common.keys import Keys
@@ -7,10 +6,217 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from bs4 import BeautifulSoup
-import tabula, urllib3, socket, os, requests, time, random, re, logging
+from concurrent.futures import ThreadPoolExecutor, Future, InvalidStateError, wait
+from collections import deque
+from urllib.parse import urlparse
+from .browser_pool import BrowserPool
+from .fetch import PooledSession, probe_link, read_body, DEFAULT_TIMEOUT, DEFAULT_RETRIES
+from .pdf_tables import PdfTableExtractor, PDF_WORKERS, PDF_PAGES
+from .cache import FetchCache, CACHE_PATH, CACHE_TTL
+from .sinks import OutputSink, QueryBuffer, create_sink
+from .events import EventQueueHandler, RunStats
+from .textextract import extract_text, extract_main_content, truncate_text
+from .dedup import NearDuplicateIndex, canonical_url
+from .journal import RunJournal
+from .pacing import Pacer, is_blocked
+from .policy import FetchPolicy, PAGE_LOAD_TIMEOUT, RUN_DEADLINE
+from concurrent.futures.process import BrokenProcessPool
+import urllib3, socket, os, requests, time, logging, threading, hashlib, json, uuid, csv
 
-def create_logging():
+# Number of links fetched in parallel
+MAX_WORKERS = 8
+
+# Number of links fetched in parallel from the same host
+PER_HOST_LIMIT = 2
+
+# Number of search queries run in parallel in batch mode
+MAX_QUERIES = 2
+
+# Number of warm browser sessions used to render pages
+BROWSER_POOL_SIZE = 2
+
+# Number of pages a browser session renders before it is restarted
+BROWSER_MAX_PAGES = 50
+
+# Pages with less text than this are rendered in the browser
+MIN_PAGE_TEXT_LENGTH = 200
+
+# Only keep the main content of pages, without navigation, footers and banners
+MAIN_CONTENT = False
+
+# Most characters of text kept per link, 0 keeps all
+MAX_TEXT_LENGTH = 0
+
+# Hosts that only render their content with javascript
+SPA_HOSTS = ("twitter.com", "x.com", "instagram.com", "facebook.com", "linkedin.com", "tiktok.com")
+
+# Folder the downloaded PDFs are stored in
+PDF_DIR = "Pdf_Files"
+
+# Index of the PDF links already downloaded to PDF_DIR, with the validators
+# the server sent for them
+PDF_INDEX_FILE = os.path.join(PDF_DIR, "index.json")
+
+# Bytes read from the network at a time when saving a PDF
+PDF_CHUNK_SIZE = 1024 * 1024
+
+# Lock guarding the PDF index between fetch workers
+pdf_index_lock = threading.Lock()
+
+# Texts written for links that could not be fetched or read
+FAILURE_TEXTS = ("Unable to get text from link", "No Table data found/Unable to get table data")
+
+# Seconds between two checks for a stop while waiting for a link
+STOP_POLL_INTERVAL = 0.5
+
+# Host the searches are sent to
+GOOGLE_HOST = "www.google.com"
+
+# Seconds to wait for the search page and the results to show up
+SEARCH_TIMEOUT = 20
+
+# Number of times a blocked search is tried again
+SEARCH_RETRIES = 3
+
+# Most Google result pages read per query
+MAX_SEARCH_PAGES = 5
+
+# Most result links processed per query
+MAX_SEARCH_RESULTS = 50
+
+# Returns the link of every search result and the address of the next result page
+RESULT_LINKS_SCRIPT = """
+const links = [];
+for (const result of document.getElementsByClassName('g')) {
+    const anchor = result.querySelector('a[href]');
+    if (anchor && anchor.href.startsWith('http')) links.push(anchor.href);
+}
+const next = document.getElementById('pnnext');
+return [links, next ? next.href : null];
+"""
+
+# Text in <noscript> tags of pages that need javascript
+NOSCRIPT_MARKERS = ("enable javascript", "javascript is disabled", "javascript is required", "requires javascript", "turn on javascript", "javascript enabled")
+
+class HostLimiter:
+    
+    """
+    Limit parallel requests per host
+    ---------------------------------
+    This class hands the links to the fetch
+    workers so that no more than `limit` links
+    of the same host are processed at the same
+    time. The other links of a busy host wait in
+    a queue of the host, and the next one is
+    handed to the workers when a link of the host
+    is done, so a worker never sits idle waiting
+    for a host while links of other hosts wait.
+
+    Parameters
+    ----------
+    executor : ThreadPoolExecutor
+        Fetch workers the links are run on
+    limit : int
+        Maximum number of links of one host
+        that are processed in parallel
+    """
+    
+    def __init__(self, executor : object, limit : int = PER_HOST_LIMIT):
+        self.executor = executor
+        self.limit = limit
+        self._lock = threading.Lock()
+        
+        # host -> links of the host in the workers
+        self._running = {}
+        
+        # host -> (future, fn, args) of the links waiting for the host
+        self._pending = {}
+        
+    def submit(self, link : str, fn : object, *args):
+        
+        """
+        Run `fn(*args)` on the fetch workers once
+        the host of `link` has a free slot, returns
+        the future of its result. Cancelling the
+        future takes a waiting link out of the queue.
+        """
+        
+        host = urlparse(link).netloc.lower()
+        future = Future()
+        
+        with self._lock:
+            running = self._running.get(host, 0)
+            
+            if running >= self.limit:
+                self._pending.setdefault(host, deque()).append((future, fn, args))
+                return future
+            
+            self._running[host] = running + 1
+            
+        if not self._start(host, future, fn, args):
+            self._next(host)
+            
+        return future
+    
+    def _start(self, host : str, future : object, fn : object, args : tuple):
+        
+        # links cancelled while they waited for their host are skipped,
+        # and whoever waits for them is woken up
+        if future.cancelled():
+            future.set_running_or_notify_cancel()
+            return False
+        
+        try:
+            worker = self.executor.submit(fn, *args)
+            
+        # no new links once the workers are shut down
+        except RuntimeError:
+            future.cancel()
+            future.set_running_or_notify_cancel()
+            return False
+        
+        future.add_done_callback(lambda f: f.cancelled() and worker.cancel())
+        worker.add_done_callback(lambda w: self._done(host, future, w))
+        return True
+    
+    def _done(self, host : str, future : object, worker : object):
+        
+        try:
+            if worker.cancelled():
+                future.cancel()
+                future.set_running_or_notify_cancel()
+            elif worker.exception() is not None:
+                future.set_exception(worker.exception())
+            else:
+                future.set_result(worker.result())
+                
+        # the future was cancelled by a stop
+        except InvalidStateError:
+            pass
+        
+        self._next(host)
+        
+    def _next(self, host : str):
+        
+        # hand the slot of the host to its next waiting link
+        while True:
+            
+            with self._lock:
+                queue = self._pending.get(host)
+                
+                if not queue:
+                    self._pending.pop(host, None)
+                    self._running[host] -= 1
+                    if not self._running[host]:
+                        del self._running[host]
+                    return
+                
+                future, fn, args = queue.popleft()
+                
+            if self._start(host, future, fn, args):
+                return
+
+def create_logging(event_queue : object = None):
     
     """
     Create a log file
@@ -18,18 +224,32 @@ def create_logging():
     This function is used to create
     and configure the logging for the
     log file that stores the log messages.
+    The log file is started over by every run.
+
+    Parameters
+    ----------
+    event_queue : multiprocessing.Queue
+        Queue the log messages are also
+        sent to, read by the GUI
     """
     
     # set logging configuration
-    logging.basicConfig(filename="log_file.log", filemode='a', format='%(message)s', level=logging.INFO)
+    logging.basicConfig(filename="log_file.log", filemode='w', format='%(message)s', level=logging.INFO)
+    
+    # stream the log messages to the GUI
+    if event_queue is not None:
+        handler = EventQueueHandler(event_queue)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logging.getLogger().addHandler(handler)
+        
     return logging
 
-def init_selenium():
+def create_browser():
     
     """
     Open up Chromedriver 
     -----------------------
-    This method is used to initialize selenium
+    This method is used to start a selenium
     chromedriver with custom configurations
     in order to crawl and scrape from the
     webpages.
@@ -81,7 +301,6 @@ def init_selenium():
         '--password-store=basic',
         '--use-gl=swiftshader',
         '--use-mock-keychain',
-        '--single-process',
         'start-maximized',
         f'user-agent={user_agent}',
         '--ignore-certificate-errors',
@@ -104,142 +323,180 @@ def init_selenium():
     options.add_experimental_option('useAutomationExtension', False)
     options.add_experimental_option("prefs", prefs)
 
-    # Global browser to use throughout the script
-    global browser
     browser = webdriver.Chrome(options=options)
 
-    # Set page load timeput of 1 minute
-    browser.set_page_load_timeout(60)
+    # Set page load timeout, shortened before every render near the run deadline
+    browser.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    
+    return browser
 
+def init_selenium(pool_size : int = BROWSER_POOL_SIZE, max_pages : int = BROWSER_MAX_PAGES):
+    
+    """
+    Start the browser pool
+    -----------------------
+    This method starts the global pool of
+    warm browser sessions that all page
+    renders are drawn from.
 
-def google_search(user_input : str):
+    Parameters
+    ----------
+    pool_size : int
+        Number of browser sessions
+    max_pages : int
+        Number of pages a session renders
+        before it is restarted
+    """
+    
+    # Global browser pool to use throughout the script
+    global browser_pool
+    browser_pool = BrowserPool(create_browser, size=pool_size, max_pages=max_pages)
+
+
+def google_search(user_input : str, max_pages : int = MAX_SEARCH_PAGES, max_results : int = MAX_SEARCH_RESULTS):
     
     """
     Perform Google Search
     ------------------------
     This method takes a user input
     and performs search on Google, 
-    stores links from search results.
+    yields the new links of every result
+    page as soon as the page is read, so
+    they can be fetched while the next
+    pages load. A browser session is only
+    taken from the pool while a result page
+    loads, never while waiting for our turn,
+    so searches don't keep the renders waiting.
 
     Parameters
     ----------
     user_input : str
         It is the input provided by
         the user to search for.
+    max_pages : int
+        Most result pages read
+    max_results : int
+        Most links yielded in total
     """
     
-    # list declared to store all search result links
-    all_links = []
+    # canonical forms of the links already yielded, Google repeats
+    # some across pages and lists variants of the same page
+    seen_links = set()
     
-    try:
+    for attempt in range(SEARCH_RETRIES):
         
-        # Redirect to Google search URL
-        browser.get('https://www.google.com/')
+        # wait for our turn, longer while Google is blocking us
+        search_pacer.wait(GOOGLE_HOST)
         
-    except (TimeoutException, WebDriverException, NoSuchElementException, InvalidSessionIdException, TimeoutError, StaleElementReferenceException, ElementClickInterceptedException, requests.exceptions.ConnectionError, urllib3.exceptions.MaxRetryError, urllib3.exceptions.NewConnectionError, socket.gaierror):
+        # Take a browser session from the pool for this page only
+        with browser_pool.session() as browser:
+            
+            try:
+                
+                # Redirect to Google search URL
+                browser.get('https://www.google.com/')
+                
+                # Waits for the searchbar instead of a fixed time
+                search = WebDriverWait(browser, SEARCH_TIMEOUT).until(EC.element_to_be_clickable((By.NAME, 'q')))
+                
+            except (TimeoutException, WebDriverException, NoSuchElementException, InvalidSessionIdException, TimeoutError, StaleElementReferenceException, ElementClickInterceptedException, requests.exceptions.ConnectionError, urllib3.exceptions.MaxRetryError, urllib3.exceptions.NewConnectionError, socket.gaierror):
+                
+                logger.info("Unable to open google. Kindly check internet connection.")
+                return
+            
+            logger.info("Google opened successfully")
+            
+            # Inputs the search string
+            search.send_keys(user_input)
+            
+            logger.info("Search string entered in Google's search text field")
+            
+            # Presses enter button
+            search.send_keys(Keys.ENTER)
+            
+            # Waits for the results or a block page, and reads the
+            # links and the next page in one round trip
+            if wait_for_results(browser):
+                search_pacer.succeeded(GOOGLE_HOST)
+                links, next_page = browser.execute_script(RESULT_LINKS_SCRIPT)
+                break
         
-        logger.info("Unable to open google. Kindly check internet connection.")
-        return all_links
-    
-    logger.info("Google opened successfully")
-    
-    # Wait for random time interval
-    time.sleep(random.randint(10, 20))
-    
-    # Finds for searchbar
-    search = browser.find_element(By.NAME, 'q')
-    
-    # Wait for random time interval
-    time.sleep(random.randint(5, 8))
-    
-    # Search string formation
-    search_string = user_input
-    
-    # Inputs the search string
-    search.send_keys(search_string)
-    
-    logger.info("Search string entered in Google's search text field")
-    
-    # Wait for random time interval
-    time.sleep(random.randint(5, 8))
-    
-    # Presses enter button
-    search.send_keys(Keys.ENTER)
-    
-    # Wait for random time interval
-    time.sleep(random.randint(10, 20))
+        backoff = search_pacer.blocked(GOOGLE_HOST)
+        logger.info(f"Google is blocking the search, trying again in {backoff:.0f} seconds")
+        
+    else:
+        logger.info("Google kept blocking the search, giving up on this query.")
+        return
 
     logger.info("Fetching the results from Google")
 
     # pagination
-    while True:
-        
-        # Looks up for search results
-        results = browser.find_elements(By.CLASS_NAME, 'g')
+    for page in range(max_pages):
         
         # Condition if search results are empty
-        if len(results) == 0:
-            logger.info("No search results found for the query.")
+        if not links:
             break
         
-        # Condition if search results are present
-        else:
-            
-            # Extracts links and add to the list
-            links = [r.find_element(By.TAG_NAME, "a").get_attribute(
-                "href") for r in results]
-            
-            # concatenate all the links
-            all_links += links
+        # keep the new links, up to the budget
+        new_links = []
+        for link in links:
+            key = canonical_url(link)
+            if key not in seen_links and len(seen_links) < max_results:
+                seen_links.add(key)
+                new_links.append(link)
+                
+        logger.info(f"Found {len(new_links)} new links on result page {page + 1}")
+        
+        if new_links:
+            yield new_links
             
-            # TODO: remove this break for Google's pagination
+        # stop at the budget or the last page
+        if len(seen_links) >= max_results or not next_page or page + 1 == max_pages:
             break
         
-            # lookup for the next button and click it when found
+        # opens the next page when it is our turn
+        search_pacer.wait(GOOGLE_HOST)
+        
+        with browser_pool.session() as browser:
+            
             try:
-                nxt_btn = browser.find_element(By.CSS_SELECTOR,"#pnnext .NVbCr+ span")
-                nxt_btn.click()
-                
-                # Wait for random time interval
-                time.sleep(random.randint(10, 20))
-                
-            except:
+                browser.get(next_page)
+            except (TimeoutException, WebDriverException):
+                logger.info("Unable to open the next result page")
                 break
             
-    return list(set(all_links))
+            if not wait_for_results(browser):
+                search_pacer.blocked(GOOGLE_HOST)
+                logger.info("Google is blocking the next result pages")
+                break
+            
+            links, next_page = browser.execute_script(RESULT_LINKS_SCRIPT)
 
-def format_data(soup : object):
+def wait_for_results(browser : object):
     
     """
-    Clean Soup Data
-    ------------------
-    This method take the soup form of page source
-    and cleans it by removing unwanted blank spaces
-    and extra newlines.
+    Wait for the search results
+    ------------------------------
+    This method waits until Google shows the
+    results container or a block page, and
+    returns False when Google is blocking us.
 
     Parameters
     ----------
-    soup : obj
-        It is the HTML soup of the webpage
+    browser : obj
+        Browser session that submitted the search
     """
-
-    # Get text from soup
-    soup_text = soup.get_text(separator="\n")
     
-    # Remove multiple newlines
-    single_line_text = str(re.sub(r'\n+', '\n', str(soup_text)))
-    
-    # Remove multiple spaces
-    single_space_text = [str(line).rstrip().lstrip()
-                         for line in single_line_text.splitlines()]
-    
-    # Remove empty strings from list
-    updated_list = list(filter(None, single_space_text))
+    try:
+        WebDriverWait(browser, SEARCH_TIMEOUT).until(lambda b: b.find_elements(By.ID, 'search') or is_blocked(b.page_source, b.current_url))
+    except TimeoutException:
+        pass
     
-    # Cleaned text
-    cleaned_text = '\n'.join(updated_list)
+    # a results page is never a block page, even if a result mentions a captcha
+    if browser.find_elements(By.ID, 'search'):
+        return True
     
-    return cleaned_text
+    return not is_blocked(browser.page_source, browser.current_url)
 
 def get_link_source(link : str):
     
@@ -248,7 +505,10 @@ def get_link_source(link : str):
     -----------------------------
     This method takes link as an input, browser
     redirects to that link and the page
-    source is extracted for scraping.
+    source is extracted for scraping. A page
+    that fails to load is rendered again after
+    a backoff, up to the render retries of the
+    fetch policy.
 
     Parameters
     ----------
@@ -257,48 +517,287 @@ def get_link_source(link : str):
         to extract the text from
     """
 
+    for attempt in range(fetch_policy.render_retries + 1):
+        
+        if attempt > 0:
+            time.sleep(fetch_policy.backoff(attempt - 1))
+            
+        # no renders after the deadline of the run
+        if fetch_policy.expired():
+            return None
+        
+        if attempt > 0:
+            logger.info(f"Rendering {link} again")
+            
+        try:
+            
+            # Take a browser session from the pool
+            with browser_pool.session() as browser:
+                
+                # Page load timeout, shorter near the deadline of the run
+                browser.set_page_load_timeout(fetch_policy.page_load_time())
+            
+                # Browser redirects to link
+                browser.get(link)
+                
+                # Driver waits until title of page is visible
+                WebDriverWait(browser, 10).until(
+                    EC.presence_of_element_located((By.TAG_NAME, 'title')))
+                
+                # Fetch page source
+                ans = browser.page_source
+                
+            break
+            
+        # In case of error occured while loading the link
+        except (TimeoutException, WebDriverException, NoSuchElementException, InvalidSessionIdException, TimeoutError, StaleElementReferenceException, ElementClickInterceptedException, requests.exceptions.ConnectionError, urllib3.exceptions.MaxRetryError, urllib3.exceptions.NewConnectionError, socket.gaierror):
+            
+            logger.info(f'Timeout Occoured loading {link}')
+            
+    # a link counts once against its host, however often it was tried
+    else:
+        host_failed(link)
+        return None
+    
+    fetch_policy.breaker.succeeded(link)
+    
+    _, kept_text, _ = parse_page_source(ans)
+    return kept_text
+
+def parse_page_source(page_source):
+    
+    """
+    Get Text from Page Source
+    -----------------------------
+    This method parses the page source and
+    returns its cleaned text, the text kept for
+    the link and the text of its <noscript> tags.
+    Only the main content is kept in main content
+    mode, the whole text still decides if the
+    page needs rendering.
+
+    Parameters
+    ----------
+    page_source : str or bytes
+        HTML of the webpage
+    """
+    
     try:
+        # Parse the page source and clean its text in one pass,
+        # javascript and stylesheet code is skipped while parsing
+        if main_content_only:
+            text, kept_text, noscript_text = extract_main_content(page_source)
+        else:
+            text, noscript_text = extract_text(page_source)
+            kept_text = text
         
-        # Browser redirects to link
-        browser.get(link)
+    except:
+        return None, None, ""
+    
+    return text, kept_text, noscript_text
+
+def needs_rendering(link : str, text : str, noscript_text : str):
+    
+    """
+    Check if a Page needs Javascript
+    -----------------------------
+    This method decides whether the text
+    parsed from the plain HTTP response is
+    enough, or the page has to be rendered
+    in the browser.
+
+    Parameters
+    ----------
+    link : str
+        Search results link form Google
+    text : str
+        Cleaned text of the HTTP response
+    noscript_text : str
+        Text of the <noscript> tags
+    """
+    
+    host = urlparse(link).netloc.lower()
+    
+    # known javascript only websites
+    if any(host == spa_host or host.endswith("." + spa_host) for spa_host in SPA_HOSTS):
+        return True
+    
+    # empty or almost empty page body
+    if text is None or len(text) < MIN_PAGE_TEXT_LENGTH:
+        return True
+    
+    # page asks to turn on javascript
+    return any(marker in noscript_text for marker in NOSCRIPT_MARKERS)
+
+def get_page_text(link : str, response : object):
+    
+    """
+    Get Text from Link
+    -----------------------------
+    This method takes the already downloaded
+    response of the link and extracts the text
+    from it. The page is only opened in the
+    browser when it needs javascript.
+
+    Parameters
+    ----------
+    link : str
+        Search results link form Google
+        to extract the text from
+    response : obj
+        Response of the request to the link
+    """
+    
+    # blocked or failed requests are retried in the browser
+    if response.ok:
         
-        # Driver waits until title of page is visible
-        WebDriverWait(browser, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, 'title')))
+        try:
+            
+            # Download the page source within the body timeout
+            page_source = read_body(response, fetch_policy.body_time())
+            
+        # a server that trickles the page would be as slow in the browser
+        except requests.exceptions.Timeout as e:
+            logger.info(str(e))
+            host_failed(link)
+            return None
+            
+        except requests.exceptions.RequestException:
+            page_source = None
+            
+        # Parse the downloaded page source
+        if page_source is not None:
+            text, kept_text, noscript_text = parse_page_source(page_source)
+            
+            if not needs_rendering(link, text, noscript_text):
+                return kept_text
+            
+    else:
+        response.close()
         
-        # Fetch page source
-        ans = browser.page_source
+    logger.info(f"Rendering {link} in the browser")
+    return get_link_source(link)
         
-    # In case of error occured while loading the link
-    except (TimeoutException, WebDriverException, NoSuchElementException, InvalidSessionIdException, TimeoutError, StaleElementReferenceException, ElementClickInterceptedException, requests.exceptions.ConnectionError, urllib3.exceptions.MaxRetryError, urllib3.exceptions.NewConnectionError, socket.gaierror):
         
-        logger.info(f'Timeout Occoured loading {link}')
-        return None
-
+def load_pdf_index():
+    
+    """
+    Load the PDF index
+    ---------------------
+    This method reads the index that maps every
+    downloaded PDF link to the hash of its file
+    and the ETag / Last-Modified it was sent with.
+    """
+    
     try:
-        # Parse the page source
-        soup = BeautifulSoup(ans, 'html.parser')
+        with open(PDF_INDEX_FILE) as fd:
+            return json.load(fd)
         
-    except:
-        return None
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_pdf(link : str, r : object):
     
-    # Remove all javascript and stylesheet code
-    for script in soup(["script", "style"]):
-        script.extract()
+    """
+    Save PDF to a content addressed file
+    --------------------------------------
+    This method streams the PDF to disk in large
+    chunks and names the file after the SHA-256 of
+    its content, so the same PDF is stored only
+    once. Links that were downloaded before are
+    not downloaded again while the server reports
+    the same ETag or Last-Modified for them, a
+    changed PDF is downloaded again.
+
+    Parameters
+    ----------
+    link : str
+        Search results link form Google
+    r : obj
+        Streamed response of the link
 
-    # Clean the page source soup
-    text = format_data(soup)
-    return text
+    Returns
+    -------
+    str
+        Path of the saved PDF or None
+    """
+    
+    # create a folder to store the PDFs
+    os.makedirs(PDF_DIR, exist_ok=True)
+    
+    # validators of this response, compared with those of the saved copy
+    validators = {"etag": r.headers.get("etag"), "last_modified": r.headers.get("last-modified")}
+    
+    # check if the PDF of the link is already saved
+    with pdf_index_lock:
+        saved = load_pdf_index().get(link)
+        
+    # indexes written before the validators were kept map the link to the hash only
+    if isinstance(saved, str):
+        saved = {"digest": saved}
+        
+    # the saved copy is only reused when the server says it has not changed
+    unchanged = saved is not None and (r.status_code == 304 or any(value is not None and saved.get(key) == value for key, value in validators.items()))
+    digest = saved["digest"] if unchanged else None
+        
+    if digest is not None and os.path.exists(os.path.join(PDF_DIR, f"{digest}.pdf")):
+        r.close()
+        logger.info(f"PDF of {link} already saved, skipping the download")
+        return os.path.join(PDF_DIR, f"{digest}.pdf")
+    
+    # save the PDF to a temporary file while hashing it
+    sha256 = hashlib.sha256()
+    part_path = os.path.join(PDF_DIR, f".{uuid.uuid4().hex}.part")
+    started, body_time = time.monotonic(), fetch_policy.body_time()
+    
+    try:
+        
+        with open(part_path, 'wb') as fd:
+            for chunk in r.iter_content(chunk_size=PDF_CHUNK_SIZE):
+                sha256.update(chunk)
+                fd.write(chunk)
+                run_stats.add_bytes(len(chunk))
+                
+                # give up on PDFs that download slower than the body timeout
+                if time.monotonic() - started > body_time:
+                    r.close()
+                    raise requests.exceptions.Timeout(f"Downloading {link} took longer than {body_time:.0f} seconds")
+                
+    except requests.exceptions.RequestException as e:
         
+        logger.info(str(e))
+        if isinstance(e, requests.exceptions.Timeout):
+            host_failed(link)
+        os.remove(part_path)
+        return None
+    
+    digest = sha256.hexdigest()
+    pdf_path = os.path.join(PDF_DIR, f"{digest}.pdf")
+    
+    # name the file after its content
+    if os.path.exists(pdf_path):
+        os.remove(part_path)
+    else:
+        os.replace(part_path, pdf_path)
         
-def save_pdf_get_table_data(link : str):
+    # remember the link
+    with pdf_index_lock:
+        pdf_index = load_pdf_index()
+        pdf_index[link] = {"digest": digest, **validators}
+        with open(PDF_INDEX_FILE, 'w') as fd:
+            json.dump(pdf_index, fd)
+            
+    return pdf_path
+
+def save_pdf_get_table_data(link : str, r : object):
     
     """
     Save PDF and Extract the table
     -----------------------------
     This method takes link as an input, and
     saves the PDF corresponding to that link.
-    It also extracts the table from the PDF.
+    The table extraction is queued to the PDF
+    worker pool.
 
     Parameters
     ----------
@@ -306,43 +805,398 @@ def save_pdf_get_table_data(link : str):
         Search results link form Google
         to extract the table from and
         save it to a folder.
+    r : obj
+        Streamed response of the link, its
+        body is saved as the PDF
+
+    Returns
+    -------
+    obj
+        Future of the list of tables or None
+    """
+    
+    # save the PDF
+    pdf_path = save_pdf(link, r)
+    
+    if pdf_path is None:
+        
+        logger.info(f"Timeout occurred opening link {link}. Could not save PDF or extract tables")
+        return None
+            
+    logger.info("PDF file saved successfully in the Pdf_Files directory")
+    
+    # detect tables in the saved file
+    return pdf_extractor.submit(pdf_path)
+
+def table_sheet_names(idx : int, count : int, prefix : str = ""):
+    
+    """
+    Names of the sheets of the tables of a link,
+    a single table keeps the sheet name of its link.
+    """
+    
+    if count == 1:
+        return [f'{prefix}{idx+1}']
+    return [f'{prefix}{idx+1}.{n+1}' for n in range(count)]
+            
+def response_body(r : object):
+    
+    """
+    Raw body of an already read response or None.
+    """
+    
+    if not r.ok:
+        return None
+    
+    try:
+        return r.content
+    except (requests.exceptions.RequestException, RuntimeError):
+        return None
+
+def cache_key(link : str):
+    
+    """
+    Key of a link in the fetch cache, the main
+    content of a page is cached apart from its
+    whole text so the two modes never mix.
+    """
+    
+    return f"main-content {link}" if main_content_only else link
+
+def cache_tables(link : str, r : object, tables_future : object):
+    
+    """
+    Store the tables of a PDF in the fetch cache
+    once the extraction worker is done.
+    """
+    
+    if not tables_future.cancelled() and tables_future.exception() is None:
+        fetch_cache.put(cache_key(link), r, tables=tables_future.result())
+
+def cached_result(link : str, entry : object):
+    
+    """
+    Get the result of a link from its cache entry
+    -----------------------------------------------
+    Returns the same tuple as `process_link`,
+    with the cached PDF tables as a finished
+    future. The cache holds the text before the
+    length cap, which is applied here.
     """
     
+    tables = FetchCache.tables(entry)
+    
+    # cached PDF tables
+    if tables is not None:
+        tables_future = Future()
+        tables_future.set_result(tables)
+        return (link, None, tables_future)
+    
+    return (link, truncate_text(entry["text"], text_length_cap), None)
+
+def process_link(idx : int, link : str, entry : object):
+    
+    """
+    Process a single link
+    -----------------------------
+    This method is run by the fetch workers.
+    It checks the type of the link and either
+    extracts the table from the PDF or the
+    text from the webpage.
+
+    Parameters
+    ----------
+    idx : int
+        Position of the link in the search results
+    link : str
+        Search results link form Google
+    entry : sqlite3.Row
+        Cached copy of the link or None
+
+    Returns
+    -------
+    tuple
+        (link, text for the Results sheet, future
+        of the PDF tables or None)
+    """
+    
+    # fresh copies are used without asking the server
+    if entry is not None and fetch_cache.is_fresh(entry):
+        logger.info(f"Using cached copy of {link}")
+        return cached_result(link, entry)
+    
+    # links that got their slot after the deadline of the run
+    if fetch_policy.expired():
+        return None
+    
+    # hosts that keep failing are skipped until their cooldown is over
+    if not fetch_policy.breaker.allow(link):
+        logger.info(f"Skipping {link}, its host keeps failing")
+        return None
+    
+    started = time.time()
+    
     try:
+        return fetch_link(link, entry)
+    
+    finally:
+        run_stats.add_host_time(link, time.time() - started)
+
+def host_failed(link : str):
+    
+    """
+    Count a failure of the host of a link in
+    the circuit breaker of the fetch policy.
+    """
+    
+    if fetch_policy.breaker.failed(link):
+        logger.info(f"{urlparse(link).netloc} failed {fetch_policy.breaker.threshold} times in a row, skipping its links for {fetch_policy.breaker.cooldown:.0f} seconds")
+
+def record_link_done(future : object):
+    
+    """
+    Count a processed link in the run stats, PDFs
+    are counted once their tables are extracted.
+    """
+    
+    # links cancelled by a stop are not counted
+    if future.cancelled():
+        return
+    
+    result = future.result() if future.exception() is None else None
+    
+    # the link could not be opened or read
+    if result is None or result[1] in FAILURE_TEXTS:
+        run_stats.link_done(failed=True)
         
-        # open the link
-        r = requests.get(link, stream=True)
+    # the PDF is still being parsed
+    elif result[2] is not None:
+        result[2].add_done_callback(lambda f: run_stats.link_done(failed=f.exception() is not None, pdf_parsed=f.exception() is None))
         
-    except (TimeoutException, WebDriverException, NoSuchElementException, InvalidSessionIdException, TimeoutError, StaleElementReferenceException, ElementClickInterceptedException, requests.exceptions.ConnectionError, urllib3.exceptions.MaxRetryError, urllib3.exceptions.NewConnectionError, socket.gaierror):
+    else:
+        run_stats.link_done()
+
+def stop_requested():
+    
+    """
+    Check if the user asked the run to stop
+    or the deadline of the run has passed.
+    """
+    
+    return (stop_event is not None and stop_event.is_set()) or fetch_policy.expired()
+
+def wait_unless_stopped(future : object):
+    
+    """
+    Wait for a future until it is done or the run
+    is stopped, returns True if it is done.
+    """
+    
+    while not future.done():
+        if stop_requested():
+            return False
+        wait([future], timeout=STOP_POLL_INTERVAL)
         
-        logger.info(f"Timeout occurred opening link {link}. Could not save PDF or extract tables")
-        return None
+    return True
+
+def journal_link(query : str, link : str, future : object):
     
-    # create a folder to store the PDFs
-    if not os.path.exists("Pdf_Files"):
-        os.makedirs("Pdf_Files")
+    """
+    Record a finished link in the run journal
+    -------------------------------------------
+    PDFs are recorded once their tables are
+    extracted. Links that could not be fetched
+    are recorded as failed and fetched again
+    when the run is resumed.
+
+    Parameters
+    ----------
+    query : str
+        Query the link was found for
+    link : str
+        Search results link
+    future : Future
+        Future of `process_link`
+    """
+    
+    # links cancelled by a stop stay pending
+    if future.cancelled():
+        return
+    
+    result = future.result() if future.exception() is None else None
+    
+    if result is None:
+        run_journal.done(query, link, failed=True)
         
-    # save the PDF
-    with open(f'Pdf_Files/PDF_{str(time.strftime("%Y%m%d-%H%M%S"))}.pdf', 'wb') as fd:
-        for chunk in r.iter_content():
-            fd.write(chunk)
+    elif result[2] is None:
+        run_journal.done(query, link, result[1], failed=result[1] in FAILURE_TEXTS)
+        
+    else:
+        result[2].add_done_callback(lambda f: journal_tables(query, link, f))
+
+def journal_tables(query : str, link : str, tables_future : object):
+    
+    """
+    Record the tables of a PDF in the run journal.
+    """
+    
+    if tables_future.cancelled() or tables_future.exception() is not None:
+        run_journal.done(query, link, failed=True)
+        
+    elif tables_future.result():
+        run_journal.done(query, link, tables=tables_future.result())
+        
+    else:
+        run_journal.done(query, link, "No Table data found/Unable to get table data")
+
+def submit_link(query : str, idx : int, link : str):
+    
+    """
+    Queue a link for the fetch workers
+    -------------------------------------
+    Links finished by the resumed run are
+    taken from the run journal instead. Fresh
+    cached copies go straight to the workers,
+    the other links wait for a slot of their
+    host in the host limiter.
+
+    Parameters
+    ----------
+    query : str
+        Query the link was found for
+    idx : int
+        Position of the link in the search results
+    link : str
+        Search results link
+
+    Returns
+    -------
+    Future
+        Future of the `process_link` result
+    """
+    
+    journaled = run_journal.result(query, link)
+    
+    if journaled is not None:
+        
+        text, tables = journaled
+        future = Future()
+        
+        # journaled PDF tables
+        if tables is not None:
+            tables_future = Future()
+            tables_future.set_result(tables)
+            future.set_result((link, None, tables_future))
+        else:
+            future.set_result((link, text, None))
             
-    logger.info("PDF file saved successfully in the Pdf_Files directory")
+    else:
+        run_journal.pending(query, link)
+        
+        # cached copy of the link
+        entry = fetch_cache.get(cache_key(link)) if fetch_cache is not None else None
+        
+        if entry is not None and fetch_cache.is_fresh(entry):
+            future = fetch_executor.submit(process_link, idx, link, entry)
+        else:
+            future = host_limiter.submit(link, process_link, idx, link, entry)
+            
+        future.add_done_callback(lambda f: journal_link(query, link, f))
+        
+    # count every link in the progress as soon as it is done
+    future.add_done_callback(record_link_done)
+    return future
+
+def fetch_link(link : str, entry : object):
+    
+    """
+    Fetch a single link
+    -----------------------------
+    This method downloads the link and either
+    saves the PDF and queues its tables or
+    extracts the text from the webpage.
+
+    Parameters
+    ----------
+    link : str
+        Search results link form Google
+    entry : obj
+        Cache entry of the link to revalidate
+        or None
+
+    Returns
+    -------
+    tuple
+        Same as `process_link`
+    """
+    
+    
+    logger.info(f"Opening link {link}")
     
     try:
         
-        # detect tables
-        table = tabula.read_pdf(link,pages=1)
+        # open the link, only the headers are downloaded here
+        validators = FetchCache.validators(entry) if entry is not None else None
+        r, content_type = probe_link(http_session, link, validators, fetch_policy.timeout())
         
-        # create a dataframe
-        df = table[0]
+    except (TimeoutError, requests.exceptions.RequestException, urllib3.exceptions.MaxRetryError, urllib3.exceptions.NewConnectionError, socket.gaierror):
         
-        return df
-    
-    except:
+        logger.info(f"Timeout occurred opening link {link}. Could not check the type of the link.")
+        host_failed(link)
         return None
+    
+    # server errors left after the retries of the session are rendered in the
+    # browser, which counts them against the host if it fails as well
+    if r.status_code < 500 and r.status_code != 429:
+        fetch_policy.breaker.succeeded(link)
+    
+    # the cached copy has not changed on the server
+    if entry is not None and r.status_code == 304:
+        
+        r.close()
+        fetch_cache.touch(cache_key(link))
+        logger.info(f"Using cached copy of {link}")
+        return cached_result(link, entry)
+        
+    # check if the link is a pdf
+    if 'application/pdf' in content_type:
+        
+        # save pdf file and extract tables from the PDF
+        tables_future = save_pdf_get_table_data(link, r)
+        
+        # If the PDF is saved
+        if tables_future is not None:
+            
+            # cache the tables when they are extracted
+            if fetch_cache is not None:
+                tables_future.add_done_callback(lambda f: cache_tables(link, r, f))
+                
+            return (link, None, tables_future)
+            
+        # if the PDF is not saved
+        return (link, "No Table data found/Unable to get table data", None)
+            
+    # if the link is a webpage, get the text from the link
+    page_text = get_page_text(link, r)
+    
+    # downloaded page source
+    body = response_body(r)
+    run_stats.add_bytes(len(body or b""))
+    
+    # if page text is extracted
+    if page_text is not None:
+        
+        # cache the page, before the length cap so later runs can use another one
+        if fetch_cache is not None:
+            fetch_cache.put(cache_key(link), r, body=body, text=page_text)
             
-def main_caller(user_input : str):
+        # keep the stored text of a link under the length cap
+        return (link, truncate_text(page_text, text_length_cap), None)
+        
+    # if page text is not extracted
+    return (link, "Unable to get text from link", None)
+
+def main_caller(user_input : str, max_workers : int = MAX_WORKERS, per_host_limit : int = PER_HOST_LIMIT, browsers : int = BROWSER_POOL_SIZE, pdf_workers : int = PDF_WORKERS, pdf_pages : str = PDF_PAGES, cache_path : str = CACHE_PATH, cache_ttl : float = CACHE_TTL, output_format : str = "excel", output_path : str = None, checkpoint_every : int = 0, max_pages : int = MAX_SEARCH_PAGES, max_results : int = MAX_SEARCH_RESULTS, main_content : bool = MAIN_CONTENT, max_text_length : int = MAX_TEXT_LENGTH, read_timeout : float = DEFAULT_TIMEOUT[1], retries : int = DEFAULT_RETRIES, deadline : float = RUN_DEADLINE, resume : bool = False, stop : object = None, event_queue : object = None):
     
     """
     Main calling function
@@ -356,112 +1210,414 @@ def main_caller(user_input : str):
     user_input : str
         It is the user input which is
         to be searched on the Google.
+    max_workers : int
+        Number of links fetched in parallel
+    per_host_limit : int
+        Number of links fetched in parallel
+        from the same host
+    browsers : int
+        Number of browser sessions used to
+        render pages
+    pdf_workers : int
+        Number of processes extracting
+        PDF tables
+    pdf_pages : str
+        Pages tables are extracted from,
+        "all" or a page range like "1-3"
+    cache_path : str
+        File of the fetch cache, None
+        turns the cache off
+    cache_ttl : float
+        Seconds a cached link is used
+        without asking the server
+    output_format : str
+        One of "excel", "csv", "jsonl"
+        or "parquet"
+    output_path : str
+        File the results are written to,
+        defaults to output.<ext>
+    checkpoint_every : int
+        Number of results after which an
+        Excel checkpoint is written, 0
+        turns checkpoints off
+    max_pages : int
+        Most Google result pages read
+        per query
+    max_results : int
+        Most result links processed
+        per query
+    main_content : bool
+        Only keep the main content of
+        pages, False keeps the full text
+    max_text_length : int
+        Most characters of text kept per
+        link, 0 keeps all
+    read_timeout : float
+        Seconds to wait for a server to send
+        data before a request fails
+    retries : int
+        Retries of failed connections and
+        retryable status codes per request
+    deadline : float
+        Seconds the run may take, links not
+        done by then are left for a resume,
+        0 turns the deadline off
+    resume : bool
+        Continue the run journal of the last
+        run, finished links are not fetched again
+    stop : multiprocessing.Event
+        Set to stop the run, the links fetched
+        so far are written to the output
+    event_queue : multiprocessing.Queue
+        Queue the log messages are sent
+        to, read by the GUI
+    """
+    
+    run_batch([user_input], max_workers=max_workers, per_host_limit=per_host_limit, browsers=browsers, pdf_workers=pdf_workers, pdf_pages=pdf_pages, cache_path=cache_path, cache_ttl=cache_ttl, output_format=output_format, output_path=output_path, checkpoint_every=checkpoint_every, max_pages=max_pages, max_results=max_results, main_content=main_content, max_text_length=max_text_length, read_timeout=read_timeout, retries=retries, deadline=deadline, resume=resume, stop=stop, event_queue=event_queue)
+
+def load_queries(path : str):
+    
+    """
+    Read search queries from a file
+    -----------------------------
+    Text files have one query per line, empty
+    lines and lines starting with # are skipped.
+    CSV files use their "query" column, or the
+    first column if there is none.
+
+    Parameters
+    ----------
+    path : str
+        Text or CSV file of queries
+    """
+    
+    with open(path, newline="", encoding="utf-8") as fd:
+        
+        if path.lower().endswith(".csv"):
+            rows = [row for row in csv.reader(fd) if row]
+            column = 0
+            
+            # use the query column of the header
+            if rows and "query" in [cell.strip().lower() for cell in rows[0]]:
+                column = [cell.strip().lower() for cell in rows[0]].index("query")
+                rows = rows[1:]
+                
+            queries = [row[column].strip() for row in rows if len(row) > column]
+            
+        else:
+            queries = [line.strip() for line in fd if not line.strip().startswith("#")]
+            
+    # drop empty and repeated queries
+    return list(dict.fromkeys(query for query in queries if query))
+
+def run_batch(queries : list, max_queries : int = MAX_QUERIES, max_workers : int = MAX_WORKERS, per_host_limit : int = PER_HOST_LIMIT, browsers : int = BROWSER_POOL_SIZE, pdf_workers : int = PDF_WORKERS, pdf_pages : str = PDF_PAGES, cache_path : str = CACHE_PATH, cache_ttl : float = CACHE_TTL, output_format : str = "excel", output_path : str = None, checkpoint_every : int = 0, max_pages : int = MAX_SEARCH_PAGES, max_results : int = MAX_SEARCH_RESULTS, main_content : bool = MAIN_CONTENT, max_text_length : int = MAX_TEXT_LENGTH, read_timeout : float = DEFAULT_TIMEOUT[1], retries : int = DEFAULT_RETRIES, deadline : float = RUN_DEADLINE, resume : bool = False, stop : object = None, event_queue : object = None):
+    
+    """
+    Run many search queries in one session
+    -----------------------------
+    This method starts the browser pool, the HTTP
+    session, the fetch cache and the workers once
+    and shares them between all queries. Up to
+    `max_queries` queries run at the same time.
+    The results are written to one output, in the
+    order of the queries, keyed by the query when
+    there is more than one.
+
+    Parameters
+    ----------
+    queries : list
+        Search queries to run
+    max_queries : int
+        Number of queries run in parallel
+    max_workers : int
+        Number of links fetched in parallel
+    per_host_limit : int
+        Number of links fetched in parallel
+        from the same host
+    browsers : int
+        Number of browser sessions used to
+        render pages
+    pdf_workers : int
+        Number of processes extracting
+        PDF tables
+    pdf_pages : str
+        Pages tables are extracted from,
+        "all" or a page range like "1-3"
+    cache_path : str
+        File of the fetch cache, None
+        turns the cache off
+    cache_ttl : float
+        Seconds a cached link is used
+        without asking the server
+    output_format : str
+        One of "excel", "csv", "jsonl"
+        or "parquet"
+    output_path : str
+        File the results are written to,
+        defaults to output.<ext>
+    checkpoint_every : int
+        Number of results after which an
+        Excel checkpoint is written, 0
+        turns checkpoints off
+    max_pages : int
+        Most Google result pages read
+        per query
+    max_results : int
+        Most result links processed
+        per query
+    main_content : bool
+        Only keep the main content of
+        pages, False keeps the full text
+    max_text_length : int
+        Most characters of text kept per
+        link, 0 keeps all
+    read_timeout : float
+        Seconds to wait for a server to send
+        data before a request fails
+    retries : int
+        Retries of failed connections and
+        retryable status codes per request
+    deadline : float
+        Seconds the run may take, links not
+        done by then are left for a resume,
+        0 turns the deadline off
+    resume : bool
+        Continue the run journal of the last
+        run, finished links are not fetched again
+    stop : multiprocessing.Event
+        Set to stop the run, the links fetched
+        so far are written to the output
+    event_queue : multiprocessing.Queue
+        Queue the log messages are sent
+        to, read by the GUI
     """
     
     # script logging
     global logger
-    logger = create_logging()
+    logger = create_logging(event_queue)
     
-    logger.info(f"Searching for --{user_input}-- in Google")
+    # progress of the run, reported to the GUI
+    global run_stats
+    run_stats = RunStats(event_queue)
     
-    # an empty dataframe
-    dataframe = pd.DataFrame(list())
-
-    # writing empty DataFrame to the new excel file
-    dataframe.to_excel('output.xlsx',index= False,)
+    # text kept of every page
+    global main_content_only, text_length_cap
+    main_content_only, text_length_cap = main_content, max_text_length
+    
+    # output file, kept open for the whole run
+    keyed = len(queries) > 1
+    output_sink = create_sink(output_format, output_path, checkpoint_every, with_query=keyed)
+    
+    # journal of the links of the run, next to the output
+    global run_journal
+    run_journal = RunJournal(f"{os.path.splitext(output_sink.path)[0]}.journal.jsonl", resume)
+    
+    # set by the GUI to stop the run early
+    global stop_event
+    stop_event = stop
+    
+    # timeouts, retries, circuit breaker and deadline of every fetch
+    global fetch_policy
+    fetch_policy = FetchPolicy((DEFAULT_TIMEOUT[0], read_timeout), retries, deadline=deadline)
     
     # intialize Selenium
-    init_selenium()
+    init_selenium(browsers)
     
-    # get links from Google
-    links = google_search(user_input)
+    # pacing of the searches, shared by all queries
+    global search_pacer
+    search_pacer = Pacer()
     
-    # final output list declared
-    final_result_list = []
+    # start the PDF table extraction workers
+    global pdf_extractor
+    pdf_extractor = PdfTableExtractor(pdf_workers, pdf_pages)
     
-    # If links are not empty
-    if len(links) > 0:
+    # open the fetch cache
+    global fetch_cache
+    fetch_cache = FetchCache(cache_path, cache_ttl) if cache_path else None
+    
+    # shared HTTP session of all the fetch workers
+    global http_session
+    http_session = PooledSession(pool_size=max_workers, retries=fetch_policy.retries, timeout=fetch_policy.timeout(), time_left=fetch_policy.time_left)
+    
+    # fetch workers and per host limits shared by all queries
+    global fetch_executor, host_limiter
+    fetch_executor = ThreadPoolExecutor(max_workers=max_workers)
+    host_limiter = HostLimiter(fetch_executor, per_host_limit)
+    
+    try:
         
-        # Iterate over links
-        for idx, link in enumerate(links):
-            
-            logger.info(f"Opening link {link}")
+        # a single query writes straight to the output
+        if not keyed:
+            run_search(queries[0], output_sink, "", max_pages, max_results)
             
-            try:
-                
-                # open the link
-                r = requests.get(link)
+        else:
+            with ThreadPoolExecutor(max_workers=max_queries) as query_executor:
                 
-            except (TimeoutException, WebDriverException, NoSuchElementException, InvalidSessionIdException, TimeoutError, StaleElementReferenceException, ElementClickInterceptedException, requests.exceptions.ConnectionError, urllib3.exceptions.MaxRetryError, urllib3.exceptions.NewConnectionError, socket.gaierror):
+                buffers = [QueryBuffer() for _ in queries]
+                futures = [query_executor.submit(run_search, query, buffer, f"q{number+1}-", max_pages, max_results) for number, (query, buffer) in enumerate(zip(queries, buffers))]
                 
-                logger.info(f"Timeout occurred opening link {link}. Could not check the type of the link.")
-                continue
+                # write the queries in their order as they finish
+                for query, buffer, future in zip(queries, buffers, futures):
+                    
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.info(f"Search for --{query}-- failed: {e}")
+                        
+                    buffer.replay(output_sink, query)
+        
+    finally:
+        
+        # write the results fetched so far
+        output_sink.close()
+        run_journal.close()
+        
+        # quit all the browsers and workers
+        fetch_executor.shutdown(wait=False, cancel_futures=True)
+        browser_pool.close()
+        pdf_extractor.close()
+        http_session.close()
+        
+        if fetch_cache is not None:
+            fetch_cache.close()
+        
+    if fetch_policy.expired():
+        logger.info("--------- RUN DEADLINE REACHED, RESUME TO FETCH THE REMAINING LINKS ---------")
+    elif stop_requested():
+        logger.info("--------- PROCESS STOPPED, RESUME TO FETCH THE REMAINING LINKS ---------")
+    else:
+        logger.info("--------- PROCESS FINISHED ---------")
+
+def run_search(user_input : str, output_sink : OutputSink, sheet_prefix : str = "", max_pages : int = MAX_SEARCH_PAGES, max_results : int = MAX_SEARCH_RESULTS):
+    
+    """
+    Search and process the results
+    -----------------------------
+    This method searches the user input on
+    Google, processes all the result links
+    and writes them to the output file.
+
+    Parameters
+    ----------
+    user_input : str
+        It is the user input which is
+        to be searched on the Google.
+    output_sink : OutputSink
+        Output the results are written to
+    sheet_prefix : str
+        Prefix of the table sheet names, keeps
+        them unique across the queries of a batch
+    max_pages : int
+        Most Google result pages read
+    max_results : int
+        Most result links processed
+    """
+    
+    # queries that did not start before a stop are skipped
+    if stop_requested():
+        return
+    
+    futures = []
+    
+    # links of the search, if it was finished by the resumed run
+    journaled_links = run_journal.search_links(user_input)
+    
+    if journaled_links is not None:
+        
+        logger.info(f"Using the search results of --{user_input}-- from the resumed run")
+        run_stats.add_discovered(len(journaled_links))
+        futures = [submit_link(user_input, idx, link) for idx, link in enumerate(journaled_links)]
+        
+    else:
+        
+        logger.info(f"Searching for --{user_input}-- in Google")
+        run_journal.search_started(user_input)
+        
+        # get links from Google, the links of a page are
+        # fetched in parallel while the next page loads
+        for links in google_search(user_input, max_pages, max_results):
             
-            try:
-                
-                # get the headers from the link
-                content_type = r.headers.get('content-type')
-                
-                
-            except:
+            run_journal.links_found(user_input, links)
+            run_stats.add_discovered(len(links))
+            
+            for link in links:
+                futures.append(submit_link(user_input, len(futures), link))
                 
-                logger.info("Could not get the content-type of the link")
-                quit()
+            # no more result pages after a stop
+            if stop_requested():
+                break
                 
-            # check if the link is a pdf
-            if 'application/pdf' in content_type:
+        if not stop_requested():
+            run_journal.search_done(user_input)
+    
+    # If links are not empty
+    if len(futures) > 0:
+        
+        # texts of the pages already written, to mark near duplicates
+        duplicates = NearDuplicateIndex()
+        
+        # collect the results in the order of the links, so the
+        # output is the same no matter which link finishes first
+        for idx, future in enumerate(futures):
+            
+            # after a stop only the links that are already done are written,
+            # the others stay pending in the journal for the next run
+            if not wait_unless_stopped(future):
+                future.cancel()
+                continue
+            
+            result = future.result()
+            
+            # skip links that could not be opened
+            if result is None:
+                continue
+            
+            link, link_text, tables_future = result
+            
+            # wait for the tables of the PDF
+            if tables_future is not None:
                 
-                # save pdf file and extract tables from the PDF
-                table_df = save_pdf_get_table_data(link)
+                if not wait_unless_stopped(tables_future):
+                    continue
                 
-                # If table is found
-                if table_df is not None:
+                try:
+                    tables = tables_future.result()
+                except BrokenProcessPool:
+                    tables = []
                     
-                    # store result
-                    final_result_list.append((link, f"Refer to sheet {idx+1} for table data"))
+                # If table is found
+                if tables:
+                    sheet_names = table_sheet_names(idx, len(tables), sheet_prefix)
+                    link_text = f"Refer to sheet {', '.join(sheet_names)} for table data"
                     
                     # write result to excel file
-                    with pd.ExcelWriter('output.xlsx', engine='openpyxl', mode='a') as writer:  
-                        table_df.to_excel(writer, sheet_name=f'{idx+1}',index= False,)
-                        
+                    for sheet_name, table_df in zip(sheet_names, tables):
+                        output_sink.add_table(sheet_name, table_df)
+                            
                 # if no table is found
                 else:
-                    final_result_list.append((link, "No Table data found/Unable to get table data"))
+                    link_text = "No Table data found/Unable to get table data"
                     
-            # if the link is a webpage
+            # the same text is only stored once, syndicated copies point to it
             else:
+                original_link = duplicates.add(link, link_text)
                 
-                # get the text from the link
-                page_text = get_link_source(link)
-                
-                # if page text is extracted
-                if page_text is not None:
-                    
-                    # store result
-                    final_result_list.append((link, page_text))
-                    
-                # if page text is not extracted
-                else:
-                    
-                    # store result
-                    final_result_list.append((link, "Unable to get text from link"))
-                
-        # create a dataframe
-        links_df = pd.DataFrame(final_result_list, columns =["links", "Web link text"])
-
-        # store results to excel file
-        with pd.ExcelWriter('output.xlsx', engine='openpyxl', mode='a') as writer:  
-            links_df.to_excel(writer, sheet_name= 'Results', index= False,)
+                if original_link is not None:
+                    logger.info(f"{link} is a near duplicate of {original_link}")
+                    link_text = f"Near duplicate of {original_link}"
+            
+            # store result
+            output_sink.add_result(link, link_text)
+            
+        run_stats.report(force=True)
     
     # if links are empty
     else:
         logger.info("No search results found for the query.")
-        
-    logger.info("--------- PROCESS FINISHED ---------")
 
 if __name__ == '__main__':
-    pass
-    # user_input = str(input("Enter your search query: "))
-    # main_caller(user_input)
-        
-    
\ No newline at end of file
+    
+    # same command line as `python -m app`, always without the GUI
+    import sys
+    from .__main__ import main
+    main(["--no-gui"] + sys.argv[1:])
@@ -0,0 +1,225 @@
+# import dependencies
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from selenium.common.exceptions import WebDriverException, InvalidSessionIdException
+import queue, threading, logging, time
+
+class BrowserPool:
+    
+    """
+    Pool of reusable browsers
+    ---------------------------
+    This class keeps a number of warm Chrome
+    sessions that are checked out for a page
+    render and checked in again afterwards.
+    Sessions are health checked on checkout and
+    recycled after `max_pages` renders or when
+    the session has died.
+
+    Parameters
+    ----------
+    factory : callable
+        Function that starts and returns a new
+        browser session
+    size : int
+        Maximum number of browser sessions
+    max_pages : int
+        Number of pages a session renders
+        before it is recycled
+    warm : bool
+        Start all sessions when the pool
+        is created
+    """
+    
+    def __init__(self, factory, size : int = 2, max_pages : int = 50, warm : bool = True):
+        self._factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self._idle = []
+        self._pages = {}
+        self._created = 0
+        self._closed = False
+        
+        # guards the idle sessions and the count of sessions, and wakes
+        # up waiting workers when a session or a free place is returned
+        self._available = threading.Condition()
+        
+        # start all the browsers in parallel
+        if warm:
+            with self._available:
+                self._created = size
+                
+            with ThreadPoolExecutor(max_workers=size) as executor:
+                self._idle.extend(executor.map(lambda _: self._create(), range(size)))
+                    
+    def _create(self):
+        
+        """
+        Start a new browser session in a place of
+        the pool that the caller has reserved, the
+        place is freed again if the start fails.
+        """
+        
+        try:
+            browser = self._factory()
+        except:
+            self._release()
+            raise
+        
+        with self._available:
+            self._pages[id(browser)] = 0
+        return browser
+    
+    def _release(self):
+        
+        """
+        Free a place in the pool and wake up a
+        worker waiting for a session.
+        """
+        
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+    
+    def _discard(self, browser : object):
+        
+        """
+        Quit a browser session and free
+        its place in the pool.
+        """
+        
+        with self._available:
+            self._pages.pop(id(browser), None)
+            
+        self._release()
+            
+        try:
+            browser.quit()
+        except Exception:
+            pass
+        
+    @staticmethod
+    def _is_healthy(browser : object):
+        
+        """
+        Check if the browser session still responds.
+        """
+        
+        try:
+            browser.current_url
+            return True
+        except WebDriverException:
+            return False
+        
+    def checkout(self, timeout : float = None):
+        
+        """
+        Take a healthy browser session from the pool
+        -----------------------------------------------
+        A new session is started if the pool is not
+        full yet, otherwise this waits until another
+        worker checks a session in or a session is
+        discarded and its place is free again.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds to wait for a free session,
+            None waits forever, raises queue.Empty
+            when it runs out
+        """
+        
+        ends = None if timeout is None else time.monotonic() + timeout
+        
+        while True:
+            
+            with self._available:
+                while True:
+                    
+                    # reuse the last idle session, it is the warmest
+                    if self._idle:
+                        browser = self._idle.pop()
+                        break
+                    
+                    # reserve a place for a new session if the pool is not full
+                    if self._created < self.size:
+                        self._created += 1
+                        browser = None
+                        break
+                    
+                    remaining = None if ends is None else ends - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise queue.Empty
+                    
+                    self._available.wait(remaining)
+                    
+            if browser is None:
+                return self._create()
+            
+            if self._is_healthy(browser):
+                return browser
+            
+            logging.info("Browser session is not responding, starting a new one")
+            self._discard(browser)
+            
+    def checkin(self, browser : object, broken : bool = False):
+        
+        """
+        Return a browser session to the pool
+        ---------------------------------------
+        The session is recycled when it is broken or
+        when it has rendered `max_pages` pages.
+
+        Parameters
+        ----------
+        browser : obj
+            Session taken with `checkout`
+        broken : bool
+            True if the session must not be reused
+        """
+        
+        with self._available:
+            self._pages[id(browser)] = self._pages.get(id(browser), 0) + 1
+            keep = not (self._closed or broken or self._pages[id(browser)] >= self.max_pages)
+            
+            if keep:
+                self._idle.append(browser)
+                self._available.notify()
+                
+        if not keep:
+            self._discard(browser)
+            
+    @contextmanager
+    def session(self, timeout : float = None):
+        
+        """
+        Check out a browser session for the
+        duration of a `with` block.
+        """
+        
+        browser = self.checkout(timeout)
+        broken = False
+        
+        try:
+            yield browser
+            
+        except InvalidSessionIdException:
+            broken = True
+            raise
+        
+        finally:
+            self.checkin(browser, broken)
+            
+    def close(self):
+        
+        """
+        Quit all idle browser sessions, sessions still
+        checked out are quit when they are checked in.
+        """
+        
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            
+        for browser in idle:
+            self._discard(browser)
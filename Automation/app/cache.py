@@ -0,0 +1,173 @@
+# import dependencies
+import sqlite3, threading, pickle, time
+
+# File the fetch cache is stored in
+CACHE_PATH = "fetch_cache.sqlite"
+
+# Seconds a cached link is used without asking the server
+CACHE_TTL = 6 * 60 * 60
+
+# Size in bytes the cache is kept under
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+class FetchCache:
+    
+    """
+    On-disk cache of fetched links
+    ---------------------------------
+    This class stores the raw body, the cleaned
+    text and the extracted PDF tables of every
+    link in a SQLite file. Entries younger than the
+    TTL are used as they are, older entries are
+    revalidated with their ETag / Last-Modified,
+    and the least recently used entries are evicted
+    when the cache grows over its size limit.
+
+    Parameters
+    ----------
+    path : str
+        SQLite file of the cache
+    ttl : float
+        Seconds an entry is fresh
+    max_bytes : int
+        Size limit of the cache
+    """
+    
+    def __init__(self, path : str = CACHE_PATH, ttl : float = CACHE_TTL, max_bytes : int = CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        
+        # one connection shared by all fetch workers
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                content_type TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB,
+                text TEXT,
+                tables BLOB,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+            
+    def get(self, url : str):
+        
+        """
+        Get the cache entry of a link or None,
+        the entry is marked as recently used.
+        """
+        
+        with self._lock, self._db:
+            entry = self._db.execute("SELECT * FROM entries WHERE url = ?", (url,)).fetchone()
+            if entry is not None:
+                self._db.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (time.time(), url))
+                
+        return entry
+    
+    def is_fresh(self, entry : object):
+        
+        """
+        Check if an entry can be used without
+        asking the server.
+        """
+        
+        return time.time() - entry["fetched_at"] < self.ttl
+    
+    @staticmethod
+    def validators(entry : object):
+        
+        """
+        Headers of a conditional request that
+        revalidates the entry.
+        """
+        
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+    
+    @staticmethod
+    def tables(entry : object):
+        
+        """
+        PDF tables stored in the entry or None.
+        """
+        
+        if entry["tables"] is None:
+            return None
+        return pickle.loads(entry["tables"])
+    
+    def touch(self, url : str):
+        
+        """
+        Mark an entry as fresh again after the
+        server answered 304 Not Modified.
+        """
+        
+        with self._lock, self._db:
+            self._db.execute("UPDATE entries SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            
+    def put(self, url : str, response : object, body : bytes = None, text : str = None, tables : list = None):
+        
+        """
+        Store a fetched link
+        -----------------------
+        Parameters
+        ----------
+        url : str
+            Link that was fetched
+        response : obj
+            Response of the link, its validators
+            are stored with the entry
+        body : bytes
+            Raw body of the link
+        text : str
+            Cleaned text of the page
+        tables : list
+            Dataframes extracted from the PDF
+        """
+        
+        tables = pickle.dumps(tables) if tables is not None else None
+        size = len(body or b"") + len((text or "").encode()) + len(tables or b"")
+        now = time.time()
+        
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+                url, response.headers.get("content-type"), response.headers.get("etag"),
+                response.headers.get("last-modified"), body, text, tables, size, now, now))
+            self._evict()
+            
+    def _evict(self):
+        
+        """
+        Delete the least recently used entries until
+        the cache is under its size limit.
+        """
+        
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        for url, size in self._db.execute("SELECT url, size FROM entries ORDER BY accessed_at").fetchall():
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+            
+    def close(self):
+        
+        """
+        Close the cache file.
+        """
+        
+        with self._lock:
+            self._db.close()
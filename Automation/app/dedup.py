@@ -0,0 +1,168 @@
+# import dependencies
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote
+import hashlib, re, threading
+import numpy as np
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = frozenset(("gclid", "dclid", "fbclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "_ga", "_gl", "ref_src", "ref_url", "spm", "amp", "usqp", "outputtype", "cmpid", "sessionid", "sid"))
+
+# Prefixes of tracking query parameters, e.g. utm_source
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_", "vero_", "oly_")
+
+# AMP versions of a page: /amp, /amp/, /amp.html, .amp and ?amp=1
+AMP_PATH_REGEX = re.compile(r"(/amp/?|/amp\.html|\.amp)$", re.I)
+
+# AMP caches that serve a copy of another host, /c/s/<host>/<path>
+AMP_CACHE_REGEX = re.compile(r"^/(?:c/)?(s/)?([^/]+)(/.*)?$")
+
+# Words per shingle of the SimHash
+SHINGLE_SIZE = 3
+
+# Fingerprints at most this many bits apart are near duplicates
+MAX_HAMMING_DISTANCE = 3
+
+# Pages with less text are never marked as near duplicates
+MIN_DUPLICATE_TEXT_LENGTH = 200
+
+def canonical_url(link : str):
+
+    """
+    Canonical form of a link
+    ---------------------------
+    This method returns the key under which
+    variants of the same page are the same:
+    http and https, www., default ports,
+    fragments, trailing slashes, tracking
+    parameters, parameter order, Google
+    redirect links and AMP pages.
+
+    Parameters
+    ----------
+    link : str
+        Search results link from Google
+    """
+
+    parts = urlsplit(link.strip())
+    host = (parts.hostname or "").lower()
+    path = parts.path
+
+    # Google redirect links point to their q / url parameter
+    if host in ("www.google.com", "google.com") and path == "/url":
+        target = dict(parse_qsl(parts.query)).get("q") or dict(parse_qsl(parts.query)).get("url")
+        if target and target.startswith("http"):
+            return canonical_url(target)
+
+    # copies of a page in the AMP caches of Google
+    if host.endswith(".cdn.ampproject.org") or (host in ("www.google.com", "google.com") and path.startswith("/amp/")):
+        match = AMP_CACHE_REGEX.match(path[len("/amp"):] if path.startswith("/amp/") else path)
+        if match:
+            query = f"?{parts.query}" if parts.query else ""
+            return canonical_url(f"https://{match.group(2)}{match.group(3) or '/'}{query}")
+
+    # www. and amp. hosts serve the same pages
+    for prefix in ("www.", "m.", "amp."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+
+    # ports other than the default one are kept
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = AMP_PATH_REGEX.sub("", unquote(path)).rstrip("/") or "/"
+
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)]
+
+    return urlunsplit(("", host, path, urlencode(sorted(query)), "")).lstrip("/")
+
+def simhash(text : str):
+
+    """
+    SimHash fingerprint of a text
+    --------------------------------
+    Every shingle of SHINGLE_SIZE words votes on
+    the 64 bits of the fingerprint, so texts that
+    share most of their shingles get fingerprints
+    that differ in only a few bits.
+
+    Parameters
+    ----------
+    text : str
+        Cleaned text of the page
+    """
+
+    words = text.lower().split()
+    shingles = [" ".join(words[idx:idx + SHINGLE_SIZE]) for idx in range(max(1, len(words) - SHINGLE_SIZE + 1))]
+
+    hashes = np.fromiter((int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little") for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+    # number of shingles with each bit set, the majority decides the bit
+    bits = np.unpackbits(hashes.view(np.uint8), bitorder="little").reshape(-1, 64)
+    majority = bits.sum(axis=0) * 2 > len(shingles)
+
+    return int.from_bytes(np.packbits(majority, bitorder="little").tobytes(), "little")
+
+class NearDuplicateIndex:
+
+    """
+    Find near duplicate pages
+    ----------------------------
+    This class keeps the SimHash of every page
+    text it has seen. The fingerprint is split in
+    MAX_HAMMING_DISTANCE + 1 bands, two fingerprints
+    within the distance share at least one band, so
+    only pages with a common band are compared.
+
+    Parameters
+    ----------
+    max_distance : int
+        Most differing bits of near duplicates
+    """
+
+    def __init__(self, max_distance : int = MAX_HAMMING_DISTANCE):
+        self.max_distance = max_distance
+        self._bands = max_distance + 1
+        self._width = 64 // self._bands
+        self._lock = threading.Lock()
+
+        # (band number, band bits) -> [(fingerprint, link)]
+        self._index = {}
+
+    def _band_keys(self, fingerprint : int):
+
+        mask = (1 << self._width) - 1
+        return [(band, (fingerprint >> (band * self._width)) & mask) for band in range(self._bands)]
+
+    def add(self, link : str, text : str):
+
+        """
+        Add the text of a link
+        -------------------------
+        Returns the link of an earlier page the text
+        is a near duplicate of, or None when the
+        text is new or too short to compare.
+
+        Parameters
+        ----------
+        link : str
+            Link the text was fetched from
+        text : str
+            Cleaned text of the page
+        """
+
+        if not text or len(text) < MIN_DUPLICATE_TEXT_LENGTH:
+            return None
+
+        fingerprint = simhash(text)
+        keys = self._band_keys(fingerprint)
+
+        with self._lock:
+            for key in keys:
+                for other, other_link in self._index.get(key, ()):
+                    if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                        return other_link
+
+            for key in keys:
+                self._index.setdefault(key, []).append((fingerprint, link))
+
+        return None
@@ -0,0 +1,158 @@
+# import dependencies
+from urllib.parse import urlparse
+import logging, threading, time
+
+class EventQueueHandler(logging.Handler):
+    
+    """
+    Send log messages to the GUI
+    ---------------------------
+    This logging handler puts every formatted log
+    message as a ("log", message) event on a
+    multiprocessing queue that the GUI reads from.
+
+    Parameters
+    ----------
+    event_queue : multiprocessing.Queue
+        Queue shared with the GUI process
+    """
+    
+    def __init__(self, event_queue : object):
+        super().__init__()
+        self.event_queue = event_queue
+        
+    def emit(self, record : logging.LogRecord):
+        try:
+            self.event_queue.put(("log", self.format(record)))
+        except Exception:
+            self.handleError(record)
+
+class RunStats:
+    
+    """
+    Progress of a run
+    ---------------------------
+    This class counts the links discovered, fetched
+    and failed, the PDFs parsed and the bytes
+    downloaded, times every host, and sends a
+    ("progress", stats) event to the GUI at most
+    every `interval` seconds.
+
+    Parameters
+    ----------
+    event_queue : multiprocessing.Queue
+        Queue shared with the GUI process, None
+        only keeps the counters
+    interval : float
+        Seconds between two progress events
+    """
+    
+    def __init__(self, event_queue : object = None, interval : float = 0.5):
+        self.event_queue = event_queue
+        self.interval = interval
+        self.started = time.time()
+        self.discovered = 0
+        self.fetched = 0
+        self.failures = 0
+        self.pdfs_parsed = 0
+        self.bytes_downloaded = 0
+        self._host_times = {}
+        self._last_report = 0
+        self._lock = threading.Lock()
+        
+    def add_discovered(self, count : int):
+        with self._lock:
+            self.discovered += count
+        self.report()
+        
+    def add_bytes(self, count : int):
+        with self._lock:
+            self.bytes_downloaded += count
+            
+    def add_host_time(self, link : str, seconds : float):
+        host = urlparse(link).netloc.lower()
+        with self._lock:
+            total, count = self._host_times.get(host, (0.0, 0))
+            self._host_times[host] = (total + seconds, count + 1)
+            
+    def link_done(self, failed : bool = False, pdf_parsed : bool = False):
+        with self._lock:
+            if failed:
+                self.failures += 1
+            else:
+                self.fetched += 1
+            if pdf_parsed:
+                self.pdfs_parsed += 1
+        self.report()
+        
+    def snapshot(self):
+        
+        """
+        Counters of the run with the derived rate,
+        ETA and the slowest hosts.
+        """
+        
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-6)
+            done = self.fetched + self.failures
+            rate = done / elapsed
+            remaining = max(self.discovered - done, 0)
+            slow_hosts = sorted(((total / count, host) for host, (total, count) in self._host_times.items()), reverse=True)[:3]
+            
+            return {
+                "discovered": self.discovered,
+                "fetched": self.fetched,
+                "failures": self.failures,
+                "done": done,
+                "pdfs_parsed": self.pdfs_parsed,
+                "bytes_downloaded": self.bytes_downloaded,
+                "elapsed": elapsed,
+                "pages_per_sec": rate,
+                "eta": remaining / rate if rate > 0 else None,
+                "slow_hosts": [(host, seconds) for seconds, host in slow_hosts],
+            }
+        
+    def report(self, force : bool = False):
+        
+        """
+        Send the stats to the GUI unless they were
+        sent less than `interval` seconds ago.
+        """
+        
+        if self.event_queue is None:
+            return
+        
+        now = time.time()
+        if not force and now - self._last_report < self.interval:
+            return
+        
+        self._last_report = now
+        self.event_queue.put(("progress", self.snapshot()))
+
+
+def format_run_stats(stats : dict):
+    
+    """
+    Format the stats of a run
+    ---------------------------
+    This method turns the payload of a ("progress",
+    stats) event into the text of the stats panel.
+
+    Parameters
+    ----------
+    stats : dict
+        Stats from `RunStats.snapshot`
+    """
+    
+    eta = stats["eta"]
+    lines = [
+        f"Links: {stats['discovered']} found, {stats['fetched']} fetched, {stats['failures']} failed",
+        f"PDFs parsed: {stats['pdfs_parsed']}",
+        f"Downloaded: {stats['bytes_downloaded'] / 1024 / 1024:.1f} MB",
+        f"Speed: {stats['pages_per_sec']:.2f} pages/s",
+        f"ETA: {'-' if eta is None else f'{int(eta) // 60}m {int(eta) % 60:02d}s'}",
+    ]
+    
+    if stats["slow_hosts"]:
+        lines.append("Slowest hosts: " + ", ".join(f"{host} ({seconds:.1f}s)" for host, seconds in stats["slow_hosts"]))
+    return "\n".join(lines)
@@ -0,0 +1,195 @@
+# import dependencies
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlparse
+import requests, time
+
+# User agent sent with every request, same as the browser
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/83.0.4103.116 Safari/537.36'
+
+# (connect, read) timeout in seconds of every request
+DEFAULT_TIMEOUT = (10, 30)
+
+# Number of retries of failed connections and retryable status codes
+DEFAULT_RETRIES = 3
+
+# Number of retries of read timeouts, a server that stalled once
+# usually stalls again, so these are the costly ones
+READ_RETRIES = 1
+
+# Bytes read from the network at a time when downloading a page, small
+# enough that the body timeout is checked often on slow servers
+BODY_CHUNK_SIZE = 8 * 1024
+
+# Status codes that are retried
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Longest wait in seconds before a retry, even if the server asks
+# for a longer one with its Retry-After header
+MAX_RETRY_WAIT = 10
+
+class BoundedRetry(Retry):
+    
+    """
+    Retries that never outlive the run
+    ------------------------------------
+    urllib3 sleeps as long as the Retry-After
+    header of a server asks for. This class waits
+    at most MAX_RETRY_WAIT seconds and never past
+    the deadline of the run, and stops retrying
+    once the deadline has passed.
+
+    Parameters
+    ----------
+    time_left : callable
+        Returns the seconds until the deadline
+        of the run, or None without a deadline
+    """
+    
+    def __init__(self, *args, time_left = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.time_left = time_left
+        
+    def new(self, **kw):
+        
+        # urllib3 copies the retry for every attempt
+        retry = super().new(**kw)
+        retry.time_left = self.time_left
+        return retry
+    
+    def _bounded(self, seconds : float):
+        
+        left = self.time_left() if self.time_left is not None else None
+        return min(seconds, MAX_RETRY_WAIT, MAX_RETRY_WAIT if left is None else left)
+        
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else self._bounded(retry_after)
+    
+    def get_backoff_time(self):
+        return self._bounded(super().get_backoff_time())
+    
+    def is_exhausted(self):
+        left = self.time_left() if self.time_left is not None else None
+        return super().is_exhausted() or (left is not None and left <= 0)
+
+class PooledSession(requests.Session):
+    
+    """
+    Shared HTTP session
+    ---------------------------
+    This class is a requests session that keeps
+    connections alive between requests, retries
+    failed connections and sets a timeout on
+    every request that does not pass one.
+
+    Parameters
+    ----------
+    pool_size : int
+        Number of connections kept alive per host
+    retries : int
+        Number of retries of a failed request,
+        read timeouts are retried at most
+        READ_RETRIES times
+    timeout : tuple
+        (connect, read) timeout in seconds
+    time_left : callable
+        Seconds until the deadline of the run,
+        retries stop waiting and retrying there
+    """
+    
+    def __init__(self, pool_size : int = 10, retries : int = DEFAULT_RETRIES, timeout : tuple = DEFAULT_TIMEOUT, time_left = None):
+        super().__init__()
+        self.timeout = timeout
+        self.headers["User-Agent"] = USER_AGENT
+        
+        # retry adapter shared by http and https
+        retry = BoundedRetry(total=retries, read=min(retries, READ_RETRIES), backoff_factor=0.5, status_forcelist=RETRY_STATUS_CODES, allowed_methods=frozenset(["HEAD", "GET"]), raise_on_status=False, time_left=time_left)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+    
+def probe_link(session : PooledSession, link : str, headers : dict = None, timeout : tuple = None):
+    
+    """
+    Detect the Content-Type of a Link
+    -----------------------------------
+    This method opens the link as a stream, so
+    only the headers are downloaded. The body is
+    only transferred when the caller reads it from
+    the returned response, which is then the one
+    and only download of the link.
+
+    Parameters
+    ----------
+    session : PooledSession
+        Shared HTTP session
+    link : str
+        Link to probe
+    headers : dict
+        Extra request headers, like the
+        validators of a cached copy
+    timeout : tuple
+        (connect, read) timeout, None uses
+        the timeout of the session
+
+    Returns
+    -------
+    tuple
+        (open streamed response, content-type)
+    """
+    
+    response = session.get(link, headers=headers, stream=True, timeout=timeout or session.timeout)
+    content_type = response.headers.get("content-type", "").lower()
+    
+    # servers that don't send a content-type, guess it from the link
+    if not content_type:
+        if urlparse(response.url).path.lower().endswith(".pdf"):
+            content_type = "application/pdf"
+        else:
+            content_type = "text/html"
+            
+    return response, content_type
+
+def read_body(response : object, timeout : float):
+    
+    """
+    Download the body of a streamed response
+    -------------------------------------------
+    The read timeout of requests only bounds a
+    single read, so a server that trickles its
+    body never times out. This method gives up
+    once the whole download takes longer than
+    `timeout` seconds.
+
+    Parameters
+    ----------
+    response : obj
+        Streamed response from `probe_link`
+    timeout : float
+        Seconds the download may take
+
+    Returns
+    -------
+    bytes
+        Body of the response, also kept as
+        its `content`
+    """
+    
+    started = time.monotonic()
+    chunks = []
+    
+    for chunk in response.iter_content(chunk_size=BODY_CHUNK_SIZE):
+        chunks.append(chunk)
+        
+        if time.monotonic() - started > timeout:
+            response.close()
+            raise requests.exceptions.Timeout(f"Downloading {response.url} took longer than {timeout:.0f} seconds")
+        
+    # keep the body on the response like requests does, so `content` works afterwards
+    response._content = b"".join(chunks)
+    return response._content
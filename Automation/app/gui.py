@@ -1,33 +1,95 @@
-from multiprocessing import Pipe, Process, freeze_support
-import time
+from multiprocessing import Process, Queue, Event, freeze_support
+from queue import Empty
+from collections import deque
 from PyQt5.QtWidgets import QMainWindow, QWidget, QMessageBox
-from PyQt5.QtCore import pyqtSignal, QThread
+from PyQt5.QtCore import pyqtSignal, QThread, QTimer, Qt, QAbstractListModel, QModelIndex
 from .ui.appgui import Ui_MainWindow
 from .automation import main_caller
+from .events import format_run_stats
 
 freeze_support()
 
+# Most log lines kept in the log view
+LOG_HISTORY = 5000
+
+# Milliseconds between two updates of the log view
+LOG_FLUSH_INTERVAL = 100
+
+# Milliseconds the worker gets to write its results after Stop
+STOP_TIMEOUT = 30000
+
+class LogListModel(QAbstractListModel):
+    """
+    Log lines shown in the log view. Only the last `max_lines` lines are kept,
+    older lines are dropped as new ones arrive.
+    """
+
+    def __init__(self, max_lines=LOG_HISTORY, parent=None):
+        super().__init__(parent)
+        self._lines = deque(maxlen=max_lines)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self._lines[index.row()]
+        return None
+
+    def append_lines(self, lines):
+        lines = lines[-self._lines.maxlen:]
+        if not lines:
+            return
+        # drop the oldest lines to make room
+        overflow = len(self._lines) + len(lines) - self._lines.maxlen
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._lines.popleft()
+            self.endRemoveRows()
+        start = len(self._lines)
+        self.beginInsertRows(QModelIndex(), start, start + len(lines) - 1)
+        self._lines.extend(lines)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._lines.clear()
+        self.endResetModel()
+
+
 class Thread(QThread):
-    log = pyqtSignal(str)
+    log = pyqtSignal(list)
+    progress = pyqtSignal(dict)
 
-    def __init__(self,parent=None):
+    def __init__(self, proc, events, parent=None):
         super(Thread, self).__init__(parent)
+        self.proc = proc
+        self.events = events
 
     def run(self):
-        scraper = "log_file.log"
-        try:
-            fp = open(scraper,"r")
-        except FileNotFoundError:
-            time.sleep(10)
-            fp = open(scraper,"r")
-        while 1:
-            where = fp.tell()
-            line = fp.readline()
-            if not line:
-                time.sleep(2)
-                fp.seek(where)
-            else:
-                self.log.emit(line)
+        # forward the events of the worker process until
+        # it has exited and all its events are read
+        while True:
+            try:
+                events = [self.events.get(timeout=0.5)]
+            except Empty:
+                if not self.proc.is_alive():
+                    break
+                continue
+            # take everything that is already waiting in one go
+            try:
+                while len(events) < 1000:
+                    events.append(self.events.get_nowait())
+            except Empty:
+                pass
+            lines = [payload for kind, payload in events if kind == "log"]
+            if lines:
+                self.log.emit(lines)
+            # only the latest progress matters
+            stats = [payload for kind, payload in events if kind == "progress"]
+            if stats:
+                self.progress.emit(stats[-1])
 
 
 class MainWindow(QMainWindow, Ui_MainWindow,QWidget):
@@ -37,19 +99,56 @@ class MainWindow(QMainWindow, Ui_MainWindow,QWidget):
         self.setupUi(self)
         self.btn_run.pressed.connect(self.execute_program)
         self.btn_stop.pressed.connect(self.terminate_program)
+        # log lines are collected and added to the view on a timer tick
+        self.log_model = LogListModel(parent=self)
+        self.list_view.setModel(self.log_model)
+        self._pending_lines = []
+        self._log_timer = QTimer(self)
+        self._log_timer.setInterval(LOG_FLUSH_INTERVAL)
+        self._log_timer.timeout.connect(self.flushLog)
+        self._log_timer.start()
+        # kills a worker that does not exit in time after Stop
+        self._kill_timer = QTimer(self)
+        self._kill_timer.setSingleShot(True)
+        self._kill_timer.setInterval(STOP_TIMEOUT)
+        self._kill_timer.timeout.connect(self.kill_program)
+        self._closing = False
     
     def start(self):
         if not self._worker.isRunning():
             self.process()
 
     def closeEvent(self, event):
-        try:
+        # a running worker is stopped first, the window closes
+        # once it has written its results or was killed
+        proc = getattr(self, "proc", None)
+        if proc is None or not proc.is_alive():
+            event.accept()
+            return
+        self._closing = True
+        if not self.stop_event.is_set():
             self.terminate_program()
-        except:
-            pass
+        event.ignore()
+
+    def toLog(self, lines):
+        self._pending_lines.extend(lines)
+        del self._pending_lines[:-LOG_HISTORY]
 
-    def toLog(self, txt):
-        self.list_view.addItem(txt)
+    def flushLog(self):
+        if not self._pending_lines:
+            return
+        scrollbar = self.list_view.verticalScrollBar()
+        at_bottom = scrollbar.value() == scrollbar.maximum()
+        self.log_model.append_lines(self._pending_lines)
+        self._pending_lines = []
+        if at_bottom:
+            self.list_view.scrollToBottom()
+
+    def updateProgress(self, stats):
+        # indeterminate until the links are known
+        self.progress_bar.setRange(0, stats["discovered"])
+        self.progress_bar.setValue(stats["done"])
+        self.stats_label.setText(format_run_stats(stats))
 
     def execute_program(self):
     
@@ -61,16 +160,44 @@ class MainWindow(QMainWindow, Ui_MainWindow,QWidget):
         self.list_view.show()
         self.text_label.show()
         self.text_label.setText("Process Status:")
-        self.proc = Process(target=main_caller, args=(self.user_input,))
+        self.log_model.clear()
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        self.stats_label.setText("")
+        self.stats_label.show()
+        self.btn_stop.setEnabled(True)
+        self._kill_timer.stop()
+        self.events = Queue()
+        self.stop_event = Event()
+        self.proc = Process(target=main_caller, args=(self.user_input,), kwargs={"event_queue": self.events, "stop": self.stop_event, "resume": self.check_resume.isChecked()})
         self.proc.start()
-        self._worker = Thread(self)
+        self._worker = Thread(self.proc, self.events, self)
         self._worker.log.connect(self.toLog)
+        self._worker.progress.connect(self.updateProgress)
+        self._worker.finished.connect(self.programStopped)
         self._worker.start()
 
     def terminate_program(self):
-        self.proc.terminate()
-        self._worker.terminate()
-        self.alert_message("Process Stopped!", "The Process has been stopped.")
+        # the worker writes the links fetched so far and exits,
+        # it is only killed if it does not exit in time
+        self.stop_event.set()
+        self.btn_stop.setEnabled(False)
+        self.text_label.setText("Stopping, writing the results fetched so far...")
+        self._kill_timer.start()
+
+    def kill_program(self):
+        if self.proc.is_alive():
+            self.proc.terminate()
+
+    def programStopped(self):
+        self._kill_timer.stop()
+        if self._closing:
+            self.close()
+            return
+        if not self.stop_event.is_set():
+            return
+        self.text_label.setText("Process Status:")
+        self.alert_message("Process Stopped!", "The Process has been stopped. Tick \"Resume the last run\" to fetch the remaining links.")
 
     def alert_message(self, title, message):	
         if title == "Alert":	
@@ -0,0 +1,174 @@
+# import dependencies
+import json, os, pickle, hashlib, threading
+
+# Link states written to the journal
+PENDING, FETCHED, FAILED = "pending", "fetched", "failed"
+
+class RunJournal:
+
+    """
+    Append-only journal of a run
+    ---------------------------------
+    This class writes one JSON line per event of
+    a run next to the output: the result links of
+    every query, every link that is submitted
+    (pending) and every link that is done (fetched
+    or failed) with its text. PDF tables are pickled
+    to the `<journal>_payloads` folder and the line
+    references their file. Lines are flushed as
+    they are written, so a crash or a stop loses at
+    most the links that were still being fetched.
+
+    With `resume` the journal of the previous run is
+    read first and appended to, so finished links
+    and finished searches are not done again.
+
+    Parameters
+    ----------
+    path : str
+        Journal file
+    resume : bool
+        Continue the journal of the previous run
+        instead of starting a new one
+    """
+
+    def __init__(self, path : str, resume : bool = False):
+        self.path = path
+        self.payload_dir = f"{os.path.splitext(path)[0]}_payloads"
+        self._lock = threading.Lock()
+
+        # query -> result links in search order, for finished searches
+        self._searches = {}
+
+        # (query, link) -> last record of the link
+        self._links = {}
+
+        if resume and os.path.exists(path):
+            self._load()
+
+        self._fd = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def _load(self):
+
+        """
+        Read the journal of the previous run,
+        a line cut off by a crash is skipped.
+        """
+
+        links = {}
+
+        with open(self.path, encoding="utf-8") as fd:
+            for line in fd:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+
+                # a search that is started again replaces the links found before
+                if record["event"] == "search":
+                    links[record["query"]] = []
+                elif record["event"] == "links":
+                    links.setdefault(record["query"], []).extend(record["links"])
+                elif record["event"] == "searched":
+                    self._searches[record["query"]] = links.get(record["query"], [])
+                elif record["event"] == "link":
+                    self._links[(record["query"], record["link"])] = record
+
+    def _write(self, record : dict):
+
+        with self._lock:
+
+            # links still being fetched when the run stops are not recorded
+            if self._fd.closed:
+                return
+
+            self._fd.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._fd.flush()
+
+    def search_links(self, query : str):
+
+        """
+        Result links of a finished search of
+        the query, or None.
+        """
+
+        return self._searches.get(query)
+
+    def search_started(self, query : str):
+        self._write({"event": "search", "query": query})
+
+    def links_found(self, query : str, links : list):
+        self._write({"event": "links", "query": query, "links": links})
+
+    def search_done(self, query : str):
+        self._write({"event": "searched", "query": query})
+
+    def result(self, query : str, link : str):
+
+        """
+        Finished result of a link
+        ----------------------------
+        Returns (text, tables) of a link that was
+        fetched in an earlier run, None if the link
+        failed or was never finished.
+
+        Parameters
+        ----------
+        query : str
+            Query the link was found for
+        link : str
+            Search results link
+        """
+
+        record = self._links.get((query, link))
+        if record is None or record["state"] != FETCHED:
+            return None
+
+        tables = None
+        if record.get("tables"):
+            try:
+                with open(os.path.join(self.payload_dir, record["tables"]), "rb") as fd:
+                    tables = pickle.load(fd)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                return None
+
+        return record.get("text"), tables
+
+    def pending(self, query : str, link : str):
+        self._write({"event": "link", "query": query, "link": link, "state": PENDING})
+
+    def done(self, query : str, link : str, text : str = None, tables : list = None, failed : bool = False):
+
+        """
+        Record a finished link
+        -------------------------
+        Parameters
+        ----------
+        query : str
+            Query the link was found for
+        link : str
+            Search results link
+        text : str
+            Text written for the link
+        tables : list
+            PDF tables of the link
+        failed : bool
+            The link could not be fetched, it is
+            fetched again when the run is resumed
+        """
+
+        record = {"event": "link", "query": query, "link": link, "state": FAILED if failed else FETCHED, "text": text}
+
+        # the tables are written before the line that points to them
+        if tables:
+            os.makedirs(self.payload_dir, exist_ok=True)
+            name = hashlib.sha1(f"{query}\n{link}".encode()).hexdigest() + ".pkl"
+            with open(os.path.join(self.payload_dir, name), "wb") as fd:
+                pickle.dump(tables, fd)
+            record["tables"] = name
+
+        self._write(record)
+
+    def close(self):
+        with self._lock:
+            self._fd.close()
@@ -0,0 +1,152 @@
+# import dependencies
+import threading, random, time
+
+# Requests per second allowed to one host once the burst is used up
+PACING_RATE = 0.5
+
+# Requests that can be sent to one host without waiting
+PACING_BURST = 2
+
+# Largest random delay in seconds added to every request
+PACING_JITTER = 1.5
+
+# Seconds waited after the first block, doubled with every further block
+BACKOFF_BASE = 30
+
+# Longest wait in seconds after a block
+BACKOFF_MAX = 600
+
+# Text of the pages a site shows instead of the content when it blocks us
+BLOCK_MARKERS = ("unusual traffic", "not a robot", "recaptcha", "captcha-form", "/sorry/index")
+
+class Pacer:
+
+    """
+    Pace the requests sent to a host
+    ---------------------------------
+    This class keeps a token bucket per host
+    so that requests only wait once the burst
+    of a host is used up, adds a small random
+    jitter to every request and backs off
+    exponentially while a host is blocking us.
+
+    Parameters
+    ----------
+    rate : float
+        Requests per second refilled
+        into the bucket of a host
+    burst : int
+        Size of the bucket of a host
+    jitter : float
+        Largest random delay in seconds
+        added to every request
+    backoff_base : float
+        Seconds waited after the first block
+    backoff_max : float
+        Longest wait in seconds after a block
+    """
+
+    def __init__(self, rate : float = PACING_RATE, burst : int = PACING_BURST, jitter : float = PACING_JITTER, backoff_base : float = BACKOFF_BASE, backoff_max : float = BACKOFF_MAX):
+        self.rate = rate
+        self.burst = burst
+        self.jitter = jitter
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+
+        # host -> (tokens, time of the last refill)
+        self._buckets = {}
+
+        # host -> (number of blocks in a row, time the backoff ends)
+        self._backoff = {}
+
+    def delay(self, host : str):
+
+        """
+        Take a token of the host
+        ---------------------------
+        This method reserves the next request
+        slot of the host and returns the seconds
+        to wait before the request is sent.
+
+        Parameters
+        ----------
+        host : str
+            Host the request is sent to
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(host, (self.burst, now))
+
+            # refill the bucket for the time passed since the last request
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+            # a missing token is paid for by waiting until it is refilled
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            self._buckets[host] = (tokens - 1, now)
+
+            # do not send anything while the host is blocking us
+            _, blocked_until = self._backoff.get(host, (0, 0))
+            wait = max(wait, blocked_until - now)
+
+        return wait + random.uniform(0, self.jitter)
+
+    def wait(self, host : str):
+
+        """
+        Sleep until a request may be sent to the host.
+        """
+
+        time.sleep(self.delay(host))
+
+    def blocked(self, host : str):
+
+        """
+        Back off from a host that blocks us
+        -------------------------------------
+        Every block in a row doubles the time no
+        request is sent to the host, up to
+        `backoff_max`. Returns the backoff in seconds.
+
+        Parameters
+        ----------
+        host : str
+            Host that blocked the request
+        """
+
+        with self._lock:
+            strikes, _ = self._backoff.get(host, (0, 0))
+            backoff = min(self.backoff_max, self.backoff_base * 2 ** strikes)
+            self._backoff[host] = (strikes + 1, time.monotonic() + backoff)
+
+        return backoff
+
+    def succeeded(self, host : str):
+
+        """
+        Forget the blocks of a host once it answers again.
+        """
+
+        with self._lock:
+            self._backoff.pop(host, None)
+
+def is_blocked(page_source : str, url : str = ""):
+
+    """
+    Detect a block or captcha page
+    ---------------------------------
+    This method checks if a site answered
+    with a captcha or "unusual traffic" page
+    instead of the requested content.
+
+    Parameters
+    ----------
+    page_source : str
+        HTML of the page
+    url : str
+        Address of the page
+    """
+
+    text = f"{url}\n{page_source[:20000]}".lower()
+    return any(marker in text for marker in BLOCK_MARKERS)
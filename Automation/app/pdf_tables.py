@@ -0,0 +1,109 @@
+# import dependencies
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import logging
+
+# Number of worker processes extracting tables
+PDF_WORKERS = 2
+
+# Pages tables are extracted from, "all" or a page range like "1-3"
+PDF_PAGES = "all"
+
+def init_worker():
+    
+    """
+    Start a table extraction worker
+    ---------------------------------
+    tabula-py runs tabula-java through jpype in
+    the process that calls it, so every worker
+    starts one JVM with its first PDF and keeps
+    it warm for all of its other PDFs.
+    """
+    
+    global tabula
+    import tabula
+    import jpype.imports
+    
+    # tabula-java lives in the technology package, which is not one of the
+    # java package domains jpype can import from by default
+    jpype.imports.registerDomain("technology")
+
+def extract_tables(pdf_path : str, pages : str = PDF_PAGES):
+    
+    """
+    Extract all tables from a PDF
+    -------------------------------
+    This method runs in a worker process and
+    detects the tables on the given pages of
+    a local PDF file.
+
+    Parameters
+    ----------
+    pdf_path : str
+        Path of the saved PDF
+    pages : str
+        "all" or a page range like "1-3"
+
+    Returns
+    -------
+    list
+        Dataframes of all non empty tables
+    """
+    
+    try:
+        
+        # detect tables
+        tables = tabula.read_pdf(pdf_path, pages=pages, multiple_tables=True)
+        
+    except Exception:
+        logging.exception(f"Unable to extract the tables of {pdf_path}")
+        return []
+    
+    return [table for table in tables if not table.empty]
+
+class PdfTableExtractor:
+    
+    """
+    Pool of PDF table extraction workers
+    --------------------------------------
+    This class keeps long lived worker processes
+    that each hold a warm JVM and extract the
+    tables of local PDF files, one at a time with
+    `submit` or as a batch with `extract_batch`.
+
+    Parameters
+    ----------
+    workers : int
+        Number of worker processes
+    pages : str
+        "all" or a page range like "1-3"
+    """
+    
+    def __init__(self, workers : int = PDF_WORKERS, pages : str = PDF_PAGES):
+        self.pages = pages
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+        
+    def submit(self, pdf_path : str):
+        
+        """
+        Queue a PDF and return a future of its tables.
+        """
+        
+        return self._executor.submit(extract_tables, pdf_path, self.pages)
+    
+    def extract_batch(self, pdf_paths : list):
+        
+        """
+        Extract the tables of a batch of PDFs, the
+        result has one list of tables per path.
+        """
+        
+        return list(self._executor.map(extract_tables, pdf_paths, repeat(self.pages)))
+    
+    def close(self):
+        
+        """
+        Stop the worker processes.
+        """
+        
+        self._executor.shutdown(wait=True, cancel_futures=True)
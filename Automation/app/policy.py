@@ -0,0 +1,236 @@
+# import dependencies
+from urllib.parse import urlparse
+from .fetch import DEFAULT_TIMEOUT, DEFAULT_RETRIES
+import threading, random, time
+
+# Seconds the body of a link may take to download, on top of the read timeout
+BODY_TIMEOUT = 90
+
+# Seconds the browser waits for a page to load
+PAGE_LOAD_TIMEOUT = 30
+
+# Number of times a page that failed to load is rendered again
+RENDER_RETRIES = 1
+
+# Seconds waited before the first retry of a render, doubled with every retry
+RETRY_BACKOFF = 2
+
+# Failures in a row after which the links of a host are skipped
+FAILURE_THRESHOLD = 3
+
+# Seconds the links of a failing host are skipped before it is tried again
+BREAKER_COOLDOWN = 120
+
+# Seconds a run may take, 0 runs until all links are done
+RUN_DEADLINE = 0
+
+class CircuitBreaker:
+
+    """
+    Stop hitting failing hosts
+    ---------------------------------
+    This class counts the failures in a row of
+    every host. After `threshold` failures the
+    circuit of the host opens and its links are
+    skipped for `cooldown` seconds. Then a single
+    link is let through to try the host again,
+    a success closes the circuit and a failure
+    opens it for another `cooldown` seconds.
+
+    Parameters
+    ----------
+    threshold : int
+        Failures in a row that open the
+        circuit of a host
+    cooldown : float
+        Seconds the circuit of a host stays open
+    """
+
+    def __init__(self, threshold : int = FAILURE_THRESHOLD, cooldown : float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+        # host -> failures in a row
+        self._failures = {}
+
+        # host -> time the open circuit may be tried again
+        self._open_until = {}
+
+        # hosts with a trial link in flight
+        self._trials = set()
+
+    @staticmethod
+    def host(link : str):
+        return urlparse(link).netloc.lower()
+
+    def allow(self, link : str):
+
+        """
+        Check if the link may be fetched
+        -----------------------------------
+        Returns False while the circuit of the host
+        is open. Every allowed link must be followed
+        by `failed` or `succeeded`, so a trial link
+        can close or open the circuit again.
+
+        Parameters
+        ----------
+        link : str
+            Link about to be fetched
+        """
+
+        host = self.host(link)
+
+        with self._lock:
+            open_until = self._open_until.get(host)
+
+            if open_until is None:
+                return True
+
+            if time.monotonic() < open_until or host in self._trials:
+                return False
+
+            # the cooldown is over, one link tries the host again
+            self._trials.add(host)
+            return True
+
+    def failed(self, link : str):
+
+        """
+        Count a failure of the host of the link,
+        returns True if it opened the circuit.
+        """
+
+        host = self.host(link)
+
+        with self._lock:
+            was_open = host in self._open_until and host not in self._trials
+            self._trials.discard(host)
+
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+
+            if failures < self.threshold:
+                return False
+
+            self._open_until[host] = time.monotonic() + self.cooldown
+            return not was_open
+
+    def succeeded(self, link : str):
+
+        """
+        Close the circuit of a host that answers again.
+        """
+
+        host = self.host(link)
+
+        with self._lock:
+            self._failures.pop(host, None)
+            self._open_until.pop(host, None)
+            self._trials.discard(host)
+
+class FetchPolicy:
+
+    """
+    Limits of every fetch of a run
+    ---------------------------------
+    This class holds the timeouts, the retries and
+    the circuit breaker shared by the HTTP session
+    and the browsers, and the deadline of the run.
+    Once the deadline is near every timeout is
+    shortened to the time that is left, so no
+    link outlives the run.
+
+    Parameters
+    ----------
+    timeout : tuple
+        (connect, read) timeout in seconds
+        of every request
+    retries : int
+        Retries of failed connections and
+        retryable status codes
+    body_timeout : float
+        Seconds the body of a link may take
+        to download
+    page_load_timeout : float
+        Seconds the browser waits for a page
+    render_retries : int
+        Number of times a failed render is retried
+    retry_backoff : float
+        Seconds before the first retry of a render
+    failure_threshold : int
+        Failures in a row that open the circuit
+        of a host
+    breaker_cooldown : float
+        Seconds the circuit of a host stays open
+    deadline : float
+        Seconds the run may take, 0 turns
+        the deadline off
+    """
+
+    def __init__(self, timeout : tuple = DEFAULT_TIMEOUT, retries : int = DEFAULT_RETRIES, body_timeout : float = BODY_TIMEOUT, page_load_timeout : float = PAGE_LOAD_TIMEOUT, render_retries : int = RENDER_RETRIES, retry_backoff : float = RETRY_BACKOFF, failure_threshold : int = FAILURE_THRESHOLD, breaker_cooldown : float = BREAKER_COOLDOWN, deadline : float = RUN_DEADLINE):
+        self.connect_timeout, self.read_timeout = timeout
+        self.retries = retries
+        self.body_timeout = body_timeout
+        self.page_load_timeout = page_load_timeout
+        self.render_retries = render_retries
+        self.retry_backoff = retry_backoff
+        self.breaker = CircuitBreaker(failure_threshold, breaker_cooldown)
+        self.ends = time.monotonic() + deadline if deadline else None
+
+    def time_left(self):
+
+        """
+        Seconds until the deadline of the run,
+        None without a deadline.
+        """
+
+        if self.ends is None:
+            return None
+        return max(self.ends - time.monotonic(), 0)
+
+    def expired(self):
+        return self.ends is not None and time.monotonic() >= self.ends
+
+    def _capped(self, seconds : float):
+
+        # a request always gets at least a second, even right before the deadline
+        left = self.time_left()
+        return seconds if left is None else max(min(seconds, left), 1)
+
+    def timeout(self):
+
+        """
+        (connect, read) timeout of the next request.
+        """
+
+        return self._capped(self.connect_timeout), self._capped(self.read_timeout)
+
+    def body_time(self):
+
+        """
+        Seconds the next body download may take.
+        """
+
+        return self._capped(self.body_timeout)
+
+    def page_load_time(self):
+
+        """
+        Seconds the browser waits for the next page.
+        """
+
+        return self._capped(self.page_load_timeout)
+
+    def backoff(self, attempt : int):
+
+        """
+        Seconds to wait before retry `attempt` + 1,
+        with jitter so retries of the same host
+        are spread out.
+        """
+
+        backoff = self.retry_backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+        left = self.time_left()
+        return backoff if left is None else min(backoff, left)
@@ -0,0 +1,349 @@
+# import dependencies
+from openpyxl import Workbook
+from abc import ABC, abstractmethod
+import pandas as pd
+import csv, json, os, logging
+
+# Columns of the Results sheet
+RESULT_COLUMNS = ["links", "Web link text"]
+
+# Most characters Excel stores in one cell
+EXCEL_CELL_LIMIT = 32767
+
+# File extension of every output format
+OUTPUT_FORMATS = {"excel": "xlsx", "csv": "csv", "jsonl": "jsonl", "parquet": "parquet"}
+
+class OutputSink(ABC):
+    
+    """
+    Output of a run
+    ---------------------------
+    Base class of the output formats. Results are
+    added one link at a time with `add_result`,
+    PDF tables with `add_table`, and the output is
+    finished with `close`. Formats that have no
+    sheets write every table to its own file in the
+    `<output>_tables` folder.
+
+    Parameters
+    ----------
+    path : str
+        File the results are written to
+    with_query : bool
+        Add a query column to the results, used
+        when one output holds many queries
+    """
+    
+    def __init__(self, path : str, with_query : bool = False):
+        self.path = path
+        self.with_query = with_query
+        self.columns = ["query"] + RESULT_COLUMNS if with_query else RESULT_COLUMNS
+        self.table_dir = f"{os.path.splitext(path)[0]}_tables"
+        
+    def result_row(self, link : str, text : str, query : str = None):
+        
+        """
+        Row of the results with the query
+        column if the output has one.
+        """
+        
+        return [query, link, text] if self.with_query else [link, text]
+        
+    def table_path(self, sheet_name : str, extension : str):
+        
+        """
+        File a table is written to.
+        """
+        
+        os.makedirs(self.table_dir, exist_ok=True)
+        return os.path.join(self.table_dir, f"{sheet_name}.{extension}")
+    
+    @abstractmethod
+    def add_result(self, link : str, text : str, query : str = None):
+        pass
+    
+    @abstractmethod
+    def add_table(self, sheet_name : str, table_df : object):
+        pass
+    
+    def close(self):
+        pass
+
+class ExcelSink(OutputSink):
+    
+    """
+    Streaming Excel output
+    ---------------------------
+    This class keeps one write-only workbook open
+    for the whole run. The Results sheet and the
+    PDF table sheets are appended to as results
+    arrive and the workbook is written once when
+    the sink is closed. Cells longer than Excel
+    allows are truncated.
+
+    Parameters
+    ----------
+    path : str
+        Excel file to write
+    checkpoint_every : int
+        Number of results after which all new rows
+        are appended to a `.partial.jsonl` file next
+        to the output, 0 turns checkpoints off.
+        The checkpoint file is started over by
+        every run and removed when the workbook
+        is written.
+    """
+    
+    def __init__(self, path : str = "output.xlsx", checkpoint_every : int = 0, with_query : bool = False):
+        super().__init__(path, with_query)
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_path = f"{os.path.splitext(path)[0]}.partial.jsonl"
+        self._pending = []
+        self._results = 0
+        
+        # start a new checkpoint file
+        if checkpoint_every and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        
+        # write-only workbook streams rows to temporary files
+        self._workbook = Workbook(write_only=True)
+        self._sheets = {}
+        self._append("Results", list(self.columns))
+        
+    def _append(self, sheet_name : str, row : list):
+        
+        """
+        Append a row to a sheet, creating the sheet
+        when it is used for the first time.
+        """
+        
+        if sheet_name not in self._sheets:
+            self._sheets[sheet_name] = self._workbook.create_sheet(sheet_name)
+            
+        # Excel can't open files with longer cells
+        for idx, value in enumerate(row):
+            if isinstance(value, str) and len(value) > EXCEL_CELL_LIMIT:
+                logging.info(f"Text in sheet {sheet_name} truncated to {EXCEL_CELL_LIMIT} characters")
+                row[idx] = value[:EXCEL_CELL_LIMIT]
+            
+        self._sheets[sheet_name].append(row)
+        
+        if self.checkpoint_every:
+            self._pending.append((sheet_name, row))
+            
+    def add_result(self, link : str, text : str, query : str = None):
+        
+        """
+        Append a row to the Results sheet.
+        """
+        
+        self._append("Results", self.result_row(link, text, query))
+        self._results += 1
+        
+        if self.checkpoint_every and self._results % self.checkpoint_every == 0:
+            self.checkpoint()
+            
+    def add_table(self, sheet_name : str, table_df : object):
+        
+        """
+        Write a PDF table to its own sheet.
+        """
+        
+        self._append(sheet_name, [str(column) for column in table_df.columns])
+        
+        for row in table_df.itertuples(index=False):
+            self._append(sheet_name, [None if pd.isna(value) else value for value in row])
+            
+    def checkpoint(self):
+        
+        """
+        Append the rows added since the last
+        checkpoint to the checkpoint file.
+        """
+        
+        with open(self.checkpoint_path, "a", encoding="utf-8") as fd:
+            for sheet_name, row in self._pending:
+                fd.write(json.dumps({"sheet": sheet_name, "row": row}, default=str) + "\n")
+                
+        self._pending = []
+        
+    def close(self):
+        
+        """
+        Write the workbook and remove the
+        checkpoint file.
+        """
+        
+        self._workbook.save(self.path)
+        
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+            
+class CsvSink(OutputSink):
+    
+    """
+    CSV output
+    ---------------------------
+    Results are streamed row by row to one CSV
+    file, every PDF table is written to its own
+    CSV file.
+    """
+    
+    def __init__(self, path : str = "output.csv", with_query : bool = False):
+        super().__init__(path, with_query)
+        self._fd = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._fd)
+        self._writer.writerow(self.columns)
+        
+    def add_result(self, link : str, text : str, query : str = None):
+        self._writer.writerow(self.result_row(link, text, query))
+        self._fd.flush()
+        
+    def add_table(self, sheet_name : str, table_df : object):
+        table_df.to_csv(self.table_path(sheet_name, "csv"), index=False)
+        
+    def close(self):
+        self._fd.close()
+        
+class JsonlSink(OutputSink):
+    
+    """
+    JSON Lines output
+    ---------------------------
+    Results are streamed as one JSON object per
+    line, every PDF table is written to its own
+    JSON Lines file.
+    """
+    
+    def __init__(self, path : str = "output.jsonl", with_query : bool = False):
+        super().__init__(path, with_query)
+        self._fd = open(path, "w", encoding="utf-8")
+        
+    def add_result(self, link : str, text : str, query : str = None):
+        self._fd.write(json.dumps(dict(zip(self.columns, self.result_row(link, text, query))), ensure_ascii=False) + "\n")
+        self._fd.flush()
+        
+    def add_table(self, sheet_name : str, table_df : object):
+        table_df.to_json(self.table_path(sheet_name, "jsonl"), orient="records", lines=True, force_ascii=False)
+        
+    def close(self):
+        self._fd.close()
+        
+class ParquetSink(OutputSink):
+    
+    """
+    Parquet output
+    ---------------------------
+    Results are written in row groups of
+    `batch_size` rows, every PDF table is written
+    to its own Parquet file. Needs pyarrow.
+    """
+    
+    def __init__(self, path : str = "output.parquet", batch_size : int = 100, with_query : bool = False):
+        super().__init__(path, with_query)
+        
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("The parquet output format needs pyarrow, install it with `pip install pyarrow`")
+        
+        self._pa = pa
+        self._schema = pa.schema([(column, pa.string()) for column in self.columns])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self.batch_size = batch_size
+        self._rows = []
+        
+    def _flush(self):
+        
+        """
+        Write the buffered results as a row group.
+        """
+        
+        if self._rows:
+            columns = [list(column) for column in zip(*self._rows)]
+            self._writer.write_table(self._pa.Table.from_arrays(columns, schema=self._schema))
+            self._rows = []
+            
+    def add_result(self, link : str, text : str, query : str = None):
+        self._rows.append(self.result_row(link, text, query))
+        
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+            
+    def add_table(self, sheet_name : str, table_df : object):
+        
+        # tabula tables mix types in one column
+        table_df = table_df.astype(str).set_axis([str(column) for column in table_df.columns], axis=1)
+        table_df.to_parquet(self.table_path(sheet_name, "parquet"), index=False)
+        
+    def close(self):
+        self._flush()
+        self._writer.close()
+        
+class QueryBuffer(OutputSink):
+    
+    """
+    Results of one query of a batch
+    ---------------------------
+    Queries of a batch run at the same time, so
+    each one writes to its own buffer, which is
+    copied to the shared output once the query
+    is done and all queries before it are written.
+    """
+    
+    def __init__(self):
+        self._results = []
+        self._tables = []
+        
+    def add_result(self, link : str, text : str, query : str = None):
+        self._results.append((link, text))
+        
+    def add_table(self, sheet_name : str, table_df : object):
+        self._tables.append((sheet_name, table_df))
+        
+    def replay(self, output_sink : OutputSink, query : str):
+        
+        """
+        Write the buffered results to the output
+        with their query.
+        """
+        
+        for sheet_name, table_df in self._tables:
+            output_sink.add_table(sheet_name, table_df)
+            
+        for link, text in self._results:
+            output_sink.add_result(link, text, query)
+            
+        self._results = []
+        self._tables = []
+        
+def create_sink(output_format : str = "excel", path : str = None, checkpoint_every : int = 0, with_query : bool = False):
+    
+    """
+    Create the output of a run
+    ----------------------------
+    Parameters
+    ----------
+    output_format : str
+        One of "excel", "csv", "jsonl", "parquet"
+    path : str
+        Output file, defaults to `output.<ext>`
+    checkpoint_every : int
+        Checkpoint interval of the Excel output
+    with_query : bool
+        Add a query column to the results
+    """
+    
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format}, use one of {', '.join(OUTPUT_FORMATS)}")
+    
+    path = path or f"output.{OUTPUT_FORMATS[output_format]}"
+    
+    if output_format == "excel":
+        return ExcelSink(path, checkpoint_every, with_query=with_query)
+    if output_format == "csv":
+        return CsvSink(path, with_query=with_query)
+    if output_format == "jsonl":
+        return JsonlSink(path, with_query=with_query)
+    return ParquetSink(path, with_query=with_query)
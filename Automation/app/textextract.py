@@ -0,0 +1,550 @@
+# import dependencies
+from html.parser import HTMLParser
+from html.entities import html5
+import codecs, re
+
+try:
+    from bs4.dammit import UnicodeDammit
+except ImportError:
+    UnicodeDammit = None
+
+try:
+    import lxml.etree, lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+# Back-end used to extract the text of pages, "html.parser" gives
+# the same text as BeautifulSoup, "auto" picks the fastest installed one
+TEXT_BACKEND = "html.parser"
+
+# Strings in these tags are not part of the text of the page
+SKIPPED_TAGS = frozenset(("script", "style", "template", "rt", "rp"))
+
+# Tags whose whitespace-only strings are kept as they are
+PRESERVED_TAGS = frozenset(("pre", "textarea"))
+
+# Whitespace BeautifulSoup collapses between tags
+ASCII_SPACES = frozenset("\x20\x0a\x09\x0c\x0d")
+
+# Tags that never have an end tag
+VOID_TAGS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem", "meta", "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid", "spacer"))
+
+# Tags that start a new block of text
+BLOCK_TAGS = frozenset(("address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "td", "th", "tr", "ul"))
+
+# Tags of headings, kept when main content follows them
+HEADING_TAGS = frozenset(("h1", "h2", "h3", "h4", "h5", "h6"))
+
+# Tags whose text is never main content
+BOILERPLATE_TAGS = frozenset(("nav", "footer", "aside", "form"))
+
+# id / class of elements whose text is never main content
+BOILERPLATE_REGEX = re.compile(r"cookie|consent|gdpr|banner|breadcrumb|footer|navbar|menu|sidebar|share|social|related|promo|advert|newsletter|subscribe|popup|modal|(^|[-_ ])(nav|ads?)($|[-_ ])", re.I)
+
+# Blocks with a larger part of their text in links are boilerplate
+MAX_LINK_DENSITY = 0.33
+
+# Blocks with at least this many characters are main content
+GOOD_BLOCK_LENGTH = 200
+
+# Blocks with less characters are only kept between main content
+SHORT_BLOCK_LENGTH = 70
+
+# Number of blocks after a heading searched for main content
+HEADING_LOOKAHEAD = 3
+
+# Named character references, without their semicolon
+ENTITIES = {name[:-1]: character for name, character in html5.items() if name.endswith(";")}
+
+# Charset declared by the page itself
+DECLARED_CHARSET_REGEX = re.compile(rb'^\s*<\?.*encoding=[\'"](.*?)[\'"].*\?>|<\s*meta[^>]+charset\s*=\s*["\']?([^>]*?)[ /;\'">]', re.I)
+
+def clean_lines(text : str, lines : list):
+
+    """
+    Add the non-empty, stripped lines
+    of a text to a list of lines.
+    """
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            lines.append(line)
+
+def decode_markup(markup):
+
+    """
+    Decode a downloaded page
+    ---------------------------
+    This method turns the bytes of a page into
+    text the same way BeautifulSoup does and
+    returns the text with the encoding used.
+
+    Parameters
+    ----------
+    markup : str or bytes
+        HTML of the webpage
+    """
+
+    if isinstance(markup, str):
+        return markup, None
+
+    # same detection as BeautifulSoup when it is installed
+    if UnicodeDammit is not None:
+        dammit = UnicodeDammit(markup, known_definite_encodings=[None], user_encodings=[None], is_html=True)
+        return dammit.markup, dammit.original_encoding
+
+    # otherwise byte order mark, declared charset, utf-8, windows-1252
+    encodings = []
+    for bom, encoding in ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")):
+        if markup.startswith(bom):
+            encodings.append(encoding)
+
+    declared = DECLARED_CHARSET_REGEX.search(markup[:1024 * 1024])
+    if declared:
+        encodings.append((declared.group(1) or declared.group(2)).decode("ascii", "replace").lower())
+
+    for encoding in encodings + ["utf-8", "windows-1252"]:
+        try:
+            return markup.decode(encoding), encoding
+        except (UnicodeDecodeError, LookupError):
+            pass
+
+    return markup.decode("utf-8", "replace"), "utf-8"
+
+class TextParser(HTMLParser):
+
+    """
+    Streaming text extractor
+    ---------------------------
+    This class collects the cleaned lines and the
+    <noscript> text of a page in one pass of the
+    standard library HTML parser. It builds no tree,
+    it only keeps the stack of open tags, and
+    follows the tree building rules of BeautifulSoup
+    so that the lines are the same as the ones of
+    `format_data` over a soup without script and
+    style tags.
+
+    Parameters
+    ----------
+    original_encoding : str
+        Encoding the page was decoded from
+    """
+
+    def __init__(self, original_encoding : str = None):
+        super().__init__(convert_charrefs=False)
+        self.original_encoding = original_encoding
+        self.lines = []
+
+        # text of the <noscript> tags, in the order they start
+        self.noscript = []
+
+        # pieces of the current string, a string ends at every markup
+        self._data = []
+
+        # names of the open tags
+        self._stack = []
+
+        # depths of the open tags whose strings are skipped, whose
+        # whitespace is kept, and the open <noscript> tags
+        self._skipped = []
+        self._preserved = []
+        self._noscript = []
+
+        # void tags closed at their start tag, their end tag is ignored once
+        self._closed_void = []
+
+    def _end_data(self, included : bool = True):
+
+        """
+        Finish the current string.
+        """
+
+        if not self._data:
+            return
+
+        text = "".join(self._data)
+        self._data = []
+
+        # whitespace between tags becomes a single space or newline
+        if not self._preserved and ASCII_SPACES.issuperset(text):
+            text = "\n" if "\n" in text else " "
+
+        # strings of script, style and template tags are not text
+        if not included:
+            return
+
+        clean_lines(text, self.lines)
+        for idx in self._noscript:
+            self.noscript[idx].append(text)
+
+    def _push(self, name : str):
+
+        self._stack.append(name)
+        if name in SKIPPED_TAGS:
+            self._skipped.append(len(self._stack))
+        elif name in PRESERVED_TAGS:
+            self._preserved.append(len(self._stack))
+        elif name == "noscript":
+            self._noscript.append(len(self.noscript))
+            self.noscript.append([])
+
+    def _pop_to(self, name : str):
+
+        # an end tag closes every tag up to the last open tag of its name
+        if name not in self._stack:
+            return
+
+        while self._stack:
+            popped = self._stack.pop()
+            if self._skipped and self._skipped[-1] > len(self._stack):
+                self._skipped.pop()
+            if self._preserved and self._preserved[-1] > len(self._stack):
+                self._preserved.pop()
+            if popped == "noscript":
+                self._noscript.pop()
+            if popped == name:
+                return
+
+    def handle_starttag(self, tag, attrs, void : bool = True):
+        self._end_data(not self._skipped)
+        self._push(tag)
+
+        if tag in VOID_TAGS and void:
+            self._end_data(not self._skipped)
+            self._pop_to(tag)
+            self._closed_void.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, void=False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._closed_void:
+            self._closed_void.remove(tag)
+            return
+
+        self._end_data(not self._skipped)
+        self._pop_to(tag)
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_charref(self, name):
+
+        # numbers under 256 are often meant as windows-1252
+        number = int(name.lstrip("xX"), 16) if name[:1] in "xX" else int(name)
+        data = None
+        if number < 256:
+            for encoding in (self.original_encoding, "windows-1252"):
+                if encoding:
+                    try:
+                        data = bytearray([number]).decode(encoding)
+                    except UnicodeDecodeError:
+                        pass
+        if not data:
+            try:
+                data = chr(number)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        self.handle_data(ENTITIES.get(name, f"&{name}"))
+
+    def handle_comment(self, data):
+        self._end_data(not self._skipped)
+
+    def handle_decl(self, data):
+        self._end_data(not self._skipped)
+
+    def handle_pi(self, data):
+        self._end_data(not self._skipped)
+
+    def unknown_decl(self, data):
+        self._end_data(not self._skipped)
+
+        # CDATA sections are text, even in skipped tags
+        if data.upper().startswith("CDATA["):
+            self._data.append(data[len("CDATA["):])
+            self._end_data()
+
+    def close(self):
+        super().close()
+        self._end_data(not self._skipped)
+
+class MainContentParser(TextParser):
+
+    """
+    Streaming text extractor with block scores
+    ---------------------------------------------
+    This class collects the same lines as
+    `TextParser` and splits them into blocks at
+    every block tag. For every block it counts the
+    characters, the characters in links and the
+    characters in navigation, footers, cookie
+    banners and similar boilerplate containers.
+    """
+
+    def __init__(self, original_encoding : str = None):
+        super().__init__(original_encoding)
+
+        # [first line, characters, link characters, boilerplate characters, heading]
+        self.blocks = []
+        self._block = [0, 0, 0, 0, False]
+
+        # depths of the open links and boilerplate containers
+        self._links = []
+        self._boilerplate = []
+        self._attrs = ()
+
+    def _close_block(self, heading : bool = False):
+
+        if self._block[1]:
+            self.blocks.append(self._block)
+        self._block = [len(self.lines), 0, 0, 0, heading]
+
+    def _end_data(self, included : bool = True):
+
+        count = len(self.lines)
+        super()._end_data(included)
+
+        if len(self.lines) > count:
+            chars = sum(len(line) for line in self.lines[count:])
+            self._block[1] += chars
+            if self._links:
+                self._block[2] += chars
+            if self._boilerplate:
+                self._block[3] += chars
+
+    def _push(self, name : str):
+
+        super()._push(name)
+        if name == "a":
+            self._links.append(len(self._stack))
+
+        marker = " ".join(value for key, value in self._attrs if key in ("id", "class") and value)
+        if name in BOILERPLATE_TAGS or (marker and BOILERPLATE_REGEX.search(marker)):
+            self._boilerplate.append(len(self._stack))
+
+    def _pop_to(self, name : str):
+
+        super()._pop_to(name)
+        while self._links and self._links[-1] > len(self._stack):
+            self._links.pop()
+        while self._boilerplate and self._boilerplate[-1] > len(self._stack):
+            self._boilerplate.pop()
+
+    def handle_starttag(self, tag, attrs, void : bool = True):
+        if tag in BLOCK_TAGS:
+            self._end_data(not self._skipped)
+            self._close_block(tag in HEADING_TAGS)
+
+        self._attrs = attrs
+        super().handle_starttag(tag, attrs, void)
+        self._attrs = ()
+
+    def handle_endtag(self, tag):
+        if tag in BLOCK_TAGS and tag not in self._closed_void:
+            self._end_data(not self._skipped)
+            self._close_block()
+
+        super().handle_endtag(tag)
+
+    def close(self):
+        super().close()
+        self._close_block()
+
+    def main_lines(self):
+
+        """
+        Lines of the main content
+        ----------------------------
+        Blocks are scored by their length, link
+        density and boilerplate share. Long blocks
+        are kept, medium blocks are kept next to
+        kept blocks, short blocks and headings only
+        between or before kept blocks. Returns all
+        lines when no block is main content.
+        """
+
+        # "good", "bad", "near" (medium) or "short" per block
+        classes = []
+        for _, chars, link_chars, boilerplate_chars, _ in self.blocks:
+            if boilerplate_chars * 2 > chars or link_chars > chars * MAX_LINK_DENSITY:
+                classes.append("bad")
+            elif chars >= GOOD_BLOCK_LENGTH:
+                classes.append("good")
+            elif chars < SHORT_BLOCK_LENGTH:
+                classes.append("short")
+            else:
+                classes.append("near")
+
+        if "good" not in classes:
+            return self.lines
+
+        def neighbour(idx, step):
+            # class of the closest good or bad block, the page edges count as bad
+            idx += step
+            while 0 <= idx < len(classes):
+                if classes[idx] in ("good", "bad"):
+                    return classes[idx]
+                idx += step
+            return "bad"
+
+        keep = []
+        for idx, cls in enumerate(classes):
+            heading = self.blocks[idx][4]
+            if cls == "near":
+                keep.append(neighbour(idx, -1) == "good" or neighbour(idx, 1) == "good")
+            elif cls == "short" and not heading:
+                keep.append(neighbour(idx, -1) == "good" and neighbour(idx, 1) == "good")
+            elif cls == "short":
+                keep.append("good" in classes[idx + 1: idx + 1 + HEADING_LOOKAHEAD])
+            else:
+                keep.append(cls == "good")
+
+        # lines of the kept blocks, a block ends where the next one starts
+        lines = []
+        ends = [block[0] for block in self.blocks[1:]] + [len(self.lines)]
+        for block, end, kept in zip(self.blocks, ends, keep):
+            if kept:
+                lines.extend(self.lines[block[0]:end])
+
+        return lines
+
+def truncate_text(text : str, max_length : int):
+
+    """
+    Cut a text after at most `max_length`
+    characters, at the end of a line when
+    possible. 0 keeps the whole text.
+    """
+
+    if not max_length or len(text) <= max_length:
+        return text
+
+    cut = text.rfind("\n", 0, max_length + 1)
+    return text[:cut if cut > 0 else max_length]
+
+def extract_with_html_parser(page_source):
+
+    markup, encoding = decode_markup(page_source)
+    parser = TextParser(encoding)
+    parser.feed(markup)
+    parser.close()
+
+    noscript_text = " ".join(" ".join(strings) for strings in parser.noscript).lower()
+    return "\n".join(parser.lines), noscript_text
+
+def extract_main_content(page_source):
+
+    """
+    Get the text and the main content of a page
+    ----------------------------------------------
+    One pass of the html.parser back-end returns
+    the cleaned text of the whole page, the text
+    of its main content and the lower case text of
+    its <noscript> tags, so the whole text can
+    still decide how the page is fetched while only
+    the main content is kept.
+
+    Parameters
+    ----------
+    page_source : str or bytes
+        HTML of the webpage
+    """
+
+    markup, encoding = decode_markup(page_source)
+    parser = MainContentParser(encoding)
+    parser.feed(markup)
+    parser.close()
+
+    noscript_text = " ".join(" ".join(strings) for strings in parser.noscript).lower()
+    return "\n".join(parser.lines), "\n".join(parser.main_lines()), noscript_text
+
+def extract_with_lxml(page_source):
+
+    root = lxml.html.document_fromstring(page_source)
+    lines = []
+    skipped = 0
+
+    # the text of an element comes before its children, its tail after them
+    for event, element in lxml.etree.iterwalk(root, events=("start", "end", "comment", "pi")):
+
+        if event == "start":
+            if element.tag in SKIPPED_TAGS:
+                skipped += 1
+            elif not skipped and element.text:
+                clean_lines(element.text, lines)
+            continue
+
+        # comments and processing instructions only have a tail
+        if event == "end" and element.tag in SKIPPED_TAGS:
+            skipped -= 1
+        if not skipped and element.tail and element is not root:
+            clean_lines(element.tail, lines)
+
+    noscript_text = " ".join(" ".join(tag.itertext()) for tag in root.iter("noscript")).lower()
+    return "\n".join(lines), noscript_text
+
+def extract_with_selectolax(page_source):
+
+    tree = SelectolaxParser(page_source)
+    noscript_text = " ".join(tag.text(separator=" ") for tag in tree.css("noscript")).lower()
+    tree.strip_tags(list(SKIPPED_TAGS))
+
+    lines = []
+    if tree.root is not None:
+        clean_lines(tree.root.text(separator="\n"), lines)
+
+    return "\n".join(lines), noscript_text
+
+# Back-ends by name, fastest first
+BACKENDS = {
+    "selectolax": extract_with_selectolax if SelectolaxParser is not None else None,
+    "lxml": extract_with_lxml if lxml is not None else None,
+    "html.parser": extract_with_html_parser,
+}
+
+def extract_text(page_source, backend : str = TEXT_BACKEND, main_content : bool = False):
+
+    """
+    Get the text of a page
+    -------------------------
+    This method returns the cleaned text of a page
+    without its script and style code, one stripped
+    line per string of the page, together with the
+    lower case text of its <noscript> tags.
+
+    Parameters
+    ----------
+    page_source : str or bytes
+        HTML of the webpage
+    backend : str
+        "html.parser", "lxml", "selectolax" or
+        "auto" for the fastest one installed
+    main_content : bool
+        Only return the lines of the main content,
+        without navigation, footers and banners.
+        Always uses the html.parser back-end.
+    """
+
+    if main_content:
+        _, main_text, noscript_text = extract_main_content(page_source)
+        return main_text, noscript_text
+
+    if backend == "auto":
+        backend = next(name for name, extract in BACKENDS.items() if extract is not None)
+
+    extract = BACKENDS.get(backend)
+    if extract is None:
+        raise ValueError(f"Text back-end {backend} is not installed")
+
+    return extract(page_source)
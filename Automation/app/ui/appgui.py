@@ -1,4 +1,4 @@
-from PyQt5.QtWidgets import QGridLayout, QPushButton, QLineEdit, QListWidget, QStyledItemDelegate, QStyle, QLabel, QWidget
+from PyQt5.QtWidgets import QGridLayout, QPushButton, QLineEdit, QListView, QStyledItemDelegate, QStyle, QLabel, QWidget, QProgressBar, QCheckBox
 
 
 class StyledItemDelegate(QStyledItemDelegate):
@@ -29,8 +29,23 @@ class Ui_MainWindow(object):
         self.line_edit_link = QLineEdit("Enter the search term to search in Google")
         self.line_edit_link.setStyleSheet('font-size: 10pt;color: grey;')
 
-        # List Widget
-        self.list_view = QListWidget()
+        # Continue the last run instead of starting over
+        self.check_resume = QCheckBox("Resume the last run")
+        self.check_resume.setStyleSheet('font-size: 10pt')
+
+        # Progress of the links of the run
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFormat("%v / %m links")
+        self.progress_bar.hide()
+
+        # Stats panel of the run
+        self.stats_label = QLabel()
+        self.stats_label.setStyleSheet('font-size: 9pt')
+        self.stats_label.hide()
+
+        # List View, its model is set by the main window
+        self.list_view = QListView()
+        self.list_view.setUniformItemSizes(True)
         # Disable clickable list
         delegate = StyledItemDelegate(self.list_view)
         self.list_view.setItemDelegate(delegate)   
@@ -42,6 +57,9 @@ class Ui_MainWindow(object):
         layout.addWidget(self.line_edit_link, 2, 0)
         layout.addWidget(self.text_label, 5, 0)
         layout.addWidget(self.btn_stop, 3, 1)
+        layout.addWidget(self.check_resume, 3, 0)
+        layout.addWidget(self.progress_bar, 4, 0, 1, 2)
+        layout.addWidget(self.stats_label, 5, 1)
         layout.addWidget(self.list_view, 6, 0, 1,3)
 
         # Set the layout on the application's window
@@ -0,0 +1,117 @@
+# Micro-benchmark of the text extraction of pages
+#
+#   python benchmarks/text_extraction.py saved_pages/
+#   python benchmarks/text_extraction.py --cache fetch_cache.sqlite
+#
+# Times the old BeautifulSoup pipeline against every installed back-end
+# of app.textextract over a corpus of saved pages and counts the pages
+# whose text differs from the old pipeline. Only the html.parser back-end
+# follows the tree rules of BeautifulSoup, lxml and selectolax build their
+# own trees and may differ on malformed markup.
+
+# import dependencies
+import argparse, os, re, sqlite3, statistics, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from app.textextract import BACKENDS, extract_text
+
+def extract_with_soup(page_source):
+
+    """
+    Text of a page as it was extracted before
+    app.textextract, used as the reference.
+    """
+
+    soup = BeautifulSoup(page_source, 'html.parser')
+    noscript_text = " ".join(tag.get_text(" ") for tag in soup("noscript")).lower()
+
+    for script in soup(["script", "style"]):
+        script.extract()
+
+    soup_text = soup.get_text(separator="\n")
+    single_line_text = str(re.sub(r'\n+', '\n', str(soup_text)))
+    single_space_text = [str(line).rstrip().lstrip() for line in single_line_text.splitlines()]
+    return '\n'.join(filter(None, single_space_text)), noscript_text
+
+def load_pages(folder : str = None, cache_path : str = None, limit : int = None):
+
+    """
+    Load the corpus
+    -------------------
+    Pages are read as bytes, like they come
+    from the network, from the .html / .htm
+    files of a folder or from the HTML bodies
+    stored in a fetch cache.
+
+    Parameters
+    ----------
+    folder : str
+        Folder of saved pages
+    cache_path : str
+        SQLite file of a fetch cache
+    limit : int
+        Most pages loaded
+    """
+
+    pages = []
+
+    if folder:
+        for root, _, files in os.walk(folder):
+            for name in sorted(files):
+                if name.lower().endswith((".html", ".htm")):
+                    with open(os.path.join(root, name), "rb") as fd:
+                        pages.append(fd.read())
+
+    if cache_path:
+        db = sqlite3.connect(cache_path)
+        rows = db.execute("SELECT body FROM entries WHERE body IS NOT NULL AND content_type LIKE '%html%'")
+        pages.extend(bytes(body) for body, in rows)
+        db.close()
+
+    return pages[:limit]
+
+def run(extract, pages : list, repeat : int):
+
+    """
+    Time an extractor over all pages, returns
+    the best total time and the texts.
+    """
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        texts = [extract(page) for page in pages]
+        timings.append(time.perf_counter() - started)
+
+    return min(timings), statistics.median(timings), texts
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Benchmark the text extraction of pages")
+    parser.add_argument("folder", nargs="?", help="folder of saved .html pages")
+    parser.add_argument("--cache", help="fetch cache to read the pages from")
+    parser.add_argument("--limit", type=int, help="most pages used")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per extractor, the best is reported")
+    args = parser.parse_args()
+
+    pages = load_pages(args.folder, args.cache, args.limit)
+    if not pages:
+        parser.error("no pages found, pass a folder of saved pages or --cache")
+
+    size = sum(len(page) for page in pages) / 1024 / 1024
+    print(f"{len(pages)} pages, {size:.1f} MB")
+
+    best, median, reference = run(extract_with_soup, pages, args.repeat)
+    print(f"{'beautifulsoup':<14} best {best:7.2f}s  median {median:7.2f}s  {len(pages) / best:8.1f} pages/s")
+
+    for backend, extract in BACKENDS.items():
+        if extract is None:
+            print(f"{backend:<14} not installed")
+            continue
+
+        best_backend, median, texts = run(lambda page: extract_text(page, backend), pages, args.repeat)
+        # the <noscript> text only feeds the rendering heuristic, compare the page text
+        different = sum(text[0] != expected[0] for text, expected in zip(texts, reference))
+        print(f"{backend:<14} best {best_backend:7.2f}s  median {median:7.2f}s  {len(pages) / best_backend:8.1f} pages/s  {best / best_backend:5.2f}x  {different} pages differ")
@@ -0,0 +1,60 @@
+import os, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.automation import HostLimiter
+
+def fetch_stub(active, peak, lock, host, seconds):
+    with lock:
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+    time.sleep(seconds)
+    with lock:
+        active[host] -= 1
+    return host
+
+def test_links_of_a_busy_host_do_not_hold_the_workers():
+    executor = ThreadPoolExecutor(max_workers=2)
+    host_limiter = HostLimiter(executor, limit=1)
+    active, peak, lock = {}, {}, threading.Lock()
+
+    try:
+        started = time.monotonic()
+        slow = [host_limiter.submit(f"https://slow.com/{idx}", fetch_stub, active, peak, lock, "slow.com", 0.5) for idx in range(3)]
+        other = host_limiter.submit("https://other.com/", fetch_stub, active, peak, lock, "other.com", 0)
+
+        # the link of the other host gets the second worker right away
+        assert other.result(timeout=5) == "other.com"
+        assert time.monotonic() - started < 0.4
+
+        wait(slow, timeout=5)
+        assert [future.result() for future in slow] == ["slow.com"] * 3
+        assert peak == {"slow.com": 1, "other.com": 1}
+
+    finally:
+        executor.shutdown()
+
+def test_cancelled_links_leave_the_queue_of_their_host():
+    executor = ThreadPoolExecutor(max_workers=2)
+    host_limiter = HostLimiter(executor, limit=1)
+    active, peak, lock = {}, {}, threading.Lock()
+
+    try:
+        futures = [host_limiter.submit(f"https://slow.com/{idx}", fetch_stub, active, peak, lock, "slow.com", 0.2) for idx in range(3)]
+        assert futures[1].cancel()
+
+        done, not_done = wait(futures, timeout=5)
+        assert not not_done
+        assert futures[1].cancelled()
+        assert futures[2].result() == "slow.com"
+
+    finally:
+        executor.shutdown()
+
+def test_links_are_cancelled_once_the_workers_are_shut_down():
+    executor = ThreadPoolExecutor(max_workers=1)
+    host_limiter = HostLimiter(executor, limit=1)
+    executor.shutdown()
+
+    assert host_limiter.submit("https://slow.com/", time.sleep, 0).cancelled()
@@ -0,0 +1,52 @@
+import os, re, sys
+
+import pytest
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.textextract import extract_text
+
+def format_data(soup):
+
+    # cleaning of the page text before app.textextract
+    soup_text = soup.get_text(separator="\n")
+    single_line_text = str(re.sub(r'\n+', '\n', str(soup_text)))
+    single_space_text = [str(line).rstrip().lstrip() for line in single_line_text.splitlines()]
+    return '\n'.join(filter(None, single_space_text))
+
+def extract_with_soup(page_source):
+    soup = BeautifulSoup(page_source, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.extract()
+    return format_data(soup)
+
+PAGES = {
+    "void tags": "<p>first<br>second<img src='a.png' alt='image'>third<hr/>fourth<input value='x'>fifth</p><p>a<wbr>b<br/>c</p>",
+    "unclosed void tags": "<div>one<br></br>two<meta charset='utf-8'><link rel='x'>three</div>",
+    "entities": "<p>Fish &amp; chips &lt;b&gt; &copy; 2023 &nbsp;caf&eacute; &notanentity; &amp &lt3 &AMP; &notin;</p>",
+    "charrefs": "<p>&#65;&#x42;&#X43; &#8212; &#128512; &#0; &#x110000; &#150; &#xd800;</p><p>&#65 &#x42 x</p>",
+    "entities in attributes": "<p title='&amp;&lt;'>text</p><a href='?a=1&b=2'>link &amp more</a>",
+    "pre and textarea": "<pre>  indented\n\n\n    code  </pre><textarea>\n  typed\n  text</textarea><p>  after  </p>",
+    "cdata": "<p>before<![CDATA[ inside <b>cdata</b> ]]>after</p><svg><![CDATA[x < y]]></svg>",
+    "comments and doctype": "<!DOCTYPE html><!-- hidden --><p>shown<!-- also hidden -->text</p><?php echo 1 ?><!bogus>",
+    "noscript, template and rt": "<noscript><p>Please enable JavaScript</p></noscript><template><p>inert</p></template><ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby><p>body</p>",
+    "script and style": "<script>var a = '<p>not text</p>';</script><style>p { color: red }</style><p>text</p><script type='application/ld+json'>{}</script>",
+    "unclosed script": "<p>text</p><script>never closed <p>inside</p>",
+    "whitespace": "<div>\n\t  lots   of \r\n spaces   </div>\n\n\n<span> a </span><span>b </span>　<p>\x0c form feed</p>",
+    "malformed": "<div><p>unclosed <b>bold <i>italic</div></p> stray </b> text <p attr=>x</p><</p>a < b > c",
+    "uppercase tags": "<HTML><BODY><P>Upper<BR>case</P><SCRIPT>hidden()</SCRIPT><Pre>  kept  </PRE></BODY></HTML>",
+}
+
+@pytest.mark.parametrize("page_source", PAGES.values(), ids=PAGES.keys())
+def test_extract_text_matches_the_soup_pipeline(page_source):
+    assert extract_text(page_source)[0] == extract_with_soup(page_source)
+
+@pytest.mark.parametrize("page_source", PAGES.values(), ids=PAGES.keys())
+def test_extract_text_matches_the_soup_pipeline_on_bytes(page_source):
+    page_bytes = ("<meta charset='utf-8'>" + page_source).encode("utf-8")
+    assert extract_text(page_bytes)[0] == extract_with_soup(page_bytes)
+
+def test_extract_text_returns_the_noscript_text():
+    _, noscript_text = extract_text("<p>body</p><noscript>Please <b>Enable</b> JavaScript</noscript>")
+    assert "please" in noscript_text and "enable" in noscript_text and "javascript" in noscript_text
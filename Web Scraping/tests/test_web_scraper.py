@@ -0,0 +1,201 @@
+import os, re, sys, textwrap, zipfile
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import web_scraper
+
+# Stands in for the UiPath robot: writes one sheet per category to the
+# workbook, saving it in place after every sheet like the robot does
+ROBOT_STUB = textwrap.dedent("""
+    import sys, time
+    from openpyxl import Workbook
+
+    path, delay = sys.argv[1], float(sys.argv[2])
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+
+    for sheetname in ["sale", "sold", "rent"]:
+        sheet = workbook.create_sheet(sheetname)
+        sheet.append(["House Features", "Address", "Price", "URL"])
+        sheet.append(["3 bds", "1 Main St Austin TX 78701", "$100", f"https://zillow.com/{sheetname}"])
+        workbook.save(path)
+        print(f"scraped {sheetname}", flush=True)
+        time.sleep(delay)
+""")
+
+SHEET_NAMES = ["sale", "sold", "rent"]
+
+def start_robot(tmp_path, delay):
+    stub = tmp_path / "robot_stub.py"
+    stub.write_text(ROBOT_STUB)
+    workbook = tmp_path / "Project_Notebook.xlsx"
+    process = web_scraper.zillow_scraper_uipath(f'"{sys.executable}" "{stub}" "{workbook}" {delay}')
+    return process, str(workbook)
+
+def test_finished_sheets_hands_out_sheets_while_the_robot_runs(tmp_path):
+    process, workbook = start_robot(tmp_path, 0.5)
+
+    running = []
+    batches = []
+    for sheets in web_scraper.finished_sheets(workbook, SHEET_NAMES, process, timeout=30, poll_interval=0.05):
+        running.append(process.poll() is None)
+        batches.append(sheets)
+
+    assert batches == [["sale"], ["sold"], ["rent"]]
+    assert process.returncode == 0
+
+    # the first sheets are finished before the robot is
+    assert running[:2] == [True, True]
+
+    sheets = [sheetname for batch in batches for sheetname in batch]
+
+    chunks = list(web_scraper.read_uipath_workbook(workbook, sheets))
+    assert [chunk["Category"].iloc[0] for chunk in chunks] == SHEET_NAMES
+
+def test_finished_sheets_stops_a_robot_that_runs_too_long(tmp_path):
+    process, workbook = start_robot(tmp_path, 60)
+
+    sheets = list(web_scraper.finished_sheets(workbook, SHEET_NAMES, process, timeout=2, poll_interval=0.05))
+
+    assert process.returncode not in (None, 0)
+    assert sheets == [["sale"]]
+
+def test_finished_sheets_skips_the_workbook_of_an_earlier_run(tmp_path):
+    path = tmp_path / "Project_Notebook.xlsx"
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for sheetname in SHEET_NAMES:
+        sheet = workbook.create_sheet(sheetname)
+        sheet.append(["House Features", "Address", "Price", "URL"])
+        sheet.append(["2 bds", "9 Old Rd Austin TX 78702", "$50", "https://zillow.com/stale"])
+    workbook.save(path)
+
+    # the earlier run saved its workbook an hour ago
+    stale = os.path.getmtime(path) - 3600
+    os.utime(path, (stale, stale))
+
+    last_saved = web_scraper.workbook_mtime(str(path))
+    process, workbook = start_robot(tmp_path, 0.5)
+
+    batches = []
+    for sheets in web_scraper.finished_sheets(workbook, SHEET_NAMES, process, timeout=30, poll_interval=0.05, since=last_saved):
+        batches.append(sheets)
+
+        # the old sheets are never handed out, only the ones the robot saved
+        for chunk in web_scraper.read_uipath_workbook(workbook, sheets):
+            assert chunk["URL"].tolist() == [f"https://zillow.com/{chunk['Category'].iloc[0]}"]
+
+    assert batches == [["sale"], ["sold"], ["rent"]]
+
+def test_finished_sheets_skips_a_workbook_the_robot_never_saved(tmp_path):
+    path = tmp_path / "Project_Notebook.xlsx"
+    workbook = Workbook()
+    workbook.active.title = "sale"
+    workbook.save(path)
+    last_saved = web_scraper.workbook_mtime(str(path))
+
+    process = web_scraper.zillow_scraper_uipath(f'"{sys.executable}" -c "pass"')
+
+    assert list(web_scraper.finished_sheets(str(path), SHEET_NAMES, process, timeout=30, poll_interval=0.05, since=last_saved)) == []
+
+def test_finished_sheets_reads_the_remaining_sheets_together(tmp_path):
+    path = tmp_path / "Project_Notebook.xlsx"
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for sheetname in SHEET_NAMES:
+        workbook.create_sheet(sheetname)
+    workbook.save(path)
+
+    # without a robot every sheet is left
+    assert list(web_scraper.finished_sheets(str(path), SHEET_NAMES)) == [SHEET_NAMES]
+
+def test_zillow_scraper_uipath_passes_the_command_unchanged_on_windows(monkeypatch):
+    commands = []
+    class FakePopen:
+        stdout = []
+        def __init__(self, args, **kwargs):
+            commands.append(args)
+
+    monkeypatch.setattr(web_scraper.subprocess, "Popen", FakePopen)
+    command = '"C:\\Program Files\\UiPath\\UiRobot.exe" execute --file "C:\\Robots\\Zillow Scraper.xaml"'
+
+    monkeypatch.setattr(web_scraper.os, "name", "nt")
+    web_scraper.zillow_scraper_uipath(command)
+    monkeypatch.setattr(web_scraper.os, "name", "posix")
+    web_scraper.zillow_scraper_uipath(command)
+
+    assert commands[0] == command
+    assert commands[1] == ["C:\\Program Files\\UiPath\\UiRobot.exe", "execute", "--file", "C:\\Robots\\Zillow Scraper.xaml"]
+
+def test_read_uipath_workbook_retries_while_the_workbook_is_saved(tmp_path, monkeypatch):
+    path = str(tmp_path / "Project_Notebook.xlsx")
+    workbook = Workbook()
+    workbook.active.title = "sale"
+    workbook.active.append(["URL", "Price", "Address", "House Features"])
+    workbook.active.append(["https://zillow.com/1", "$100", "1 Main St Austin TX 78701", "3 bds"])
+    workbook.save(path)
+
+    # the first open hits the workbook in the middle of a save
+    load_workbook = web_scraper.load_workbook
+    attempts = []
+    def flaky_load_workbook(*args, **kwargs):
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise zipfile.BadZipFile("File is not a zip file")
+        return load_workbook(*args, **kwargs)
+
+    monkeypatch.setattr(web_scraper, "load_workbook", flaky_load_workbook)
+    monkeypatch.setattr(web_scraper.time, "sleep", lambda seconds: None)
+
+    chunks = list(web_scraper.read_uipath_workbook(path, ["sale"]))
+
+    assert len(attempts) == 2
+    assert chunks[0]["URL"].tolist() == ["https://zillow.com/1"]
+
+def test_open_workbook_gives_up_after_the_retries(tmp_path, monkeypatch):
+    path = tmp_path / "broken.xlsx"
+    path.write_bytes(b"not a workbook")
+    monkeypatch.setattr(web_scraper.time, "sleep", lambda seconds: None)
+
+    with pytest.raises(zipfile.BadZipFile):
+        web_scraper.open_workbook(str(path), retries=2)
+
+def clean_zillow_rows(df):
+
+    # row by row cleaning of the records before clean_zillow_frame
+    results = list()
+    for idx, row in df.iterrows():
+        raw_features = str(row["House Features"].split("-")[0]).lstrip().rstrip()
+        features = str(re.sub("[A-Za-z]+", lambda ele: " " + ele[0] + " ", raw_features)).replace("  ", " ")
+        raw_address = str(row["Address"]).split()
+        address = ",".join(str(row["Address"]).split(",")[:-1])
+        if str(raw_address[-1]).isnumeric():
+            state = str(raw_address[-2])
+            zipcode = str(raw_address[-1])
+        else:
+            state = str(raw_address[-3])
+            zipcode = " ".join(raw_address[-2:])
+        results.append((row["Category"], features, address, state, zipcode, row["Price"], row["URL"]))
+    return results
+
+ZILLOW_RECORDS = [
+    ("sale", "3 bds2 ba1,850 sqft - House for sale", "123 Main St, Austin, TX 78701", "$450,000", "https://zillow.com/1"),
+    ("sale", "  4 bds 3 ba 2,400 sqft  -  Townhouse - Open house ", "9 Elm Ave Unit 2, Round Rock, TX 78664", "$615,000", "https://zillow.com/2"),
+    ("sold", "Studio1 ba500 sqft", "55 Queen St W, Toronto, ON M5V 3L9", "$300,000", "https://zillow.com/3"),
+    ("sold", "2bds1ba-Condo", "1 Lake Shore Dr Chicago IL 60611", "$250,000", "https://zillow.com/4"),
+    ("rent", "1 bd1 ba--", "Apt 4B,  200 W  34th St,\tNew York,  NY   10001", "$3,100/mo", "https://zillow.com/5"),
+    ("rent", "-- bds-- ba-- sqft", "PO Box 12, Anchorage, AK 99501-1234", "$1,200/mo", "https://zillow.com/6"),
+    ("rent", "3 bds", "Plot 7, Springfield, XX 1A2 B3C", "$900/mo", "https://zillow.com/7"),
+]
+
+def test_clean_zillow_frame_matches_the_row_by_row_cleaning():
+    df = pd.DataFrame(ZILLOW_RECORDS, columns=["Category", "House Features", "Address", "Price", "URL"])
+
+    cleaned = web_scraper.clean_zillow_frame(df)
+
+    assert list(cleaned.columns) == web_scraper.OUTPUT_COLUMNS
+    assert list(cleaned.itertuples(index=False, name=None)) == clean_zillow_rows(df)
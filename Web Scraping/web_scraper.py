@@ -1,7 +1,47 @@
 # import dependencies
-import re, logging, os
+from openpyxl import load_workbook
+import re, logging, os, argparse, sqlite3, time, subprocess, shlex, threading
 import pandas as pd
 
+# Command that runs the UiPath robot scraping Zillow
+UIPATH_COMMAND = "C:\\Users\\aditya.k\\AppData\\Local\\Programs\\UiPath\\Studio\\UiRobot.exe execute -p ZillowScraper"
+
+# Workbook the UiPath robot writes the scraped records to
+UIPATH_EXCEL_PATH = "C:\\Users\\aditya.k\\.nuget\\packages\\zillowscraper\\1.0.1\\content\\Project_Notebook.xlsx"
+
+# Seconds the UiPath robot may run before it is stopped
+UIPATH_TIMEOUT = 2 * 60 * 60
+
+# Seconds between two checks of the UiPath workbook
+UIPATH_POLL_INTERVAL = 10
+
+# Times the UiPath workbook is opened again when the robot is saving it
+WORKBOOK_RETRIES = 5
+
+# Seconds between two attempts to open the UiPath workbook
+WORKBOOK_RETRY_DELAY = 2
+
+# Columns of the UiPath workbook used for the output, with their types
+UIPATH_COLUMNS = {"House Features": object, "Address": object, "Price": object, "URL": object}
+
+# Rows of the UiPath workbook read at a time
+CHUNK_SIZE = 10000
+
+# Columns of the final output
+OUTPUT_COLUMNS = ["Category", "House Features", "Address", "State", "Zipcode", "Price", "URL"]
+
+# Last two or three words of an address: [state] state-or-zip zipcode
+STATE_ZIPCODE_REGEX = re.compile(r"(?:^|(?<=\s))(?:(?P<third>\S+)\s+)?(?P<second>\S+)\s+(?P<last>\S+)\s*$")
+
+# Columns of the delta output of an incremental run
+DELTA_COLUMNS = ["Status"] + OUTPUT_COLUMNS + ["Previous Category", "Previous Price"]
+
+# File of the index of the listings seen by earlier runs
+LISTING_INDEX_PATH = "listing_index.sqlite"
+
+# File extension of every output format
+OUTPUT_FORMATS = {"excel": "xlsx", "csv": "csv", "jsonl": "jsonl", "parquet": "parquet"}
+
 def create_logging():
     
     """
@@ -17,21 +57,416 @@ def create_logging():
 
     return logging
 
-def zillow_scraper_uipath():
+def zillow_scraper_uipath(command : str = UIPATH_COMMAND):
     
     """
     Scrape data from Zillow via UiPath
     ---------------------------
-    This method is used to run the UiPath
-    to scrape data from Zillow using the 
-    command line interface.
+    This method is used to start the UiPath
+    robot to scrape data from Zillow using the 
+    command line interface. The robot runs in
+    the background and its output is streamed
+    into the log.
 
+    Parameters
+    ----------
+    command : str
+        Command that runs the robot
+
+    Returns
+    -------
+    subprocess.Popen
+        The running robot process
     """
     
+    # Windows programs parse their own command line, so it is passed as it is,
+    # splitting it would quote the quoted path of the robot a second time
+    args = command if os.name == "nt" else shlex.split(command)
+    
     # run the process via command line
-    os.system("C:\\Users\\aditya.k\\AppData\\Local\\Programs\\UiPath\\Studio\\UiRobot.exe execute -p ZillowScraper")
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace")
+    
+    def stream_output():
+        for line in process.stdout:
+            logging.info(f"UiRobot: {line.rstrip()}")
+            
+    threading.Thread(target=stream_output, daemon=True).start()
+    
+    return process
+
+def workbook_sheet_names(path : str):
+    
+    """
+    Names of the sheets in a workbook, empty while
+    the workbook is missing or being written.
+    """
+    
+    try:
+        workbook = load_workbook(path, read_only=True)
+    except Exception:
+        return []
+    
+    sheet_names = workbook.sheetnames
+    workbook.close()
+    return sheet_names
+
+def open_workbook(path : str, retries : int = WORKBOOK_RETRIES, delay : float = WORKBOOK_RETRY_DELAY):
+    
+    """
+    Open the UiPath workbook in read-only mode
+    ---------------------------
+    The robot saves the workbook while it is
+    read, and a read during a save fails like
+    a broken file. The workbook is opened again
+    after a delay, the error of the last attempt
+    is raised.
+
+    Parameters
+    ----------
+    path : str
+        Workbook the robot writes to
+    retries : int
+        Attempts after the first one
+    delay : float
+        Seconds between two attempts
+    """
+    
+    for attempt in range(retries + 1):
+        
+        try:
+            return load_workbook(path, read_only=True, data_only=True)
+        
+        except Exception as e:
+            
+            if attempt == retries:
+                raise
+            
+            logging.info(f"Unable to open {path} ({e!r}), trying again in {delay} seconds")
+            time.sleep(delay)
+
+def workbook_mtime(path : str):
+    
+    """
+    Time the workbook was last saved, None
+    while it does not exist.
+    """
+    
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def finished_sheets(path : str, sheet_names : list, process : object = None, timeout : float = UIPATH_TIMEOUT, poll_interval : float = UIPATH_POLL_INTERVAL, since : float = None):
+    
+    """
+    Wait for the robot to finish the sheets
+    ---------------------------
+    This method watches the workbook while the
+    robot runs. The robot scrapes the categories
+    in order, so a sheet is finished as soon as
+    the sheet after it shows up, and it is handed
+    out while the robot keeps scraping. The sheets
+    left when the robot stops are handed out
+    together, so they are read in one pass. The
+    robot is stopped when it runs longer than the
+    timeout.
+    
+    The workbook survives between runs, so its
+    sheets only count once it was saved after
+    `since`, the time it was last saved before
+    the robot started.
+
+    Parameters
+    ----------
+    path : str
+        Workbook the robot writes to
+    sheet_names : list
+        Sheets in the order the robot writes them
+    process : subprocess.Popen
+        The running robot, None if the workbook
+        is already complete
+    timeout : float
+        Seconds the robot may run
+    poll_interval : float
+        Seconds between two checks of the workbook
+    since : float
+        Last save of the workbook of an earlier
+        run, None if there was none or the
+        workbook is already complete
+        
+    Yields
+    ------
+    list
+        Names of finished sheets, to be
+        read together
+    """
+    
+    def saved_sheets():
+        # the sheets of a workbook left by an earlier run are not ours
+        if since is not None and (workbook_mtime(path) or 0) <= since:
+            return []
+        return workbook_sheet_names(path)
+    
+    deadline = time.time() + timeout
+    done = 0
+    
+    while process is not None and process.poll() is None:
+        
+        if time.time() > deadline:
+            process.kill()
+            process.wait()
+            logging.error(f"UiRobot did not finish in {timeout} seconds and was stopped")
+            break
+        
+        # a sheet is finished when the robot has started on the next one
+        available = saved_sheets()
+        while done < len(sheet_names) - 1 and sheet_names[done + 1] in available:
+            yield [sheet_names[done]]
+            done += 1
+            
+        time.sleep(poll_interval)
+        
+    if process is not None:
+        if process.returncode == 0:
+            logging.info("UiRobot finished successfully")
+        else:
+            logging.error(f"UiRobot exited with code {process.returncode}")
+            
+    # the remaining sheets are finished once the robot has stopped
+    available = saved_sheets()
+    if since is not None and not available:
+        logging.error(f"UiRobot did not save {path}, the sheets of the earlier run are skipped")
+        
+    for sheetname in sheet_names[done:]:
+        if sheetname not in available:
+            logging.error(f"Sheet {sheetname} is missing from {path}")
+            
+    remaining = [sheetname for sheetname in sheet_names[done:] if sheetname in available]
+    if remaining:
+        yield remaining
     
-def create_final_output_excel(results : list):
+def read_uipath_workbook(path : str, sheet_names : list, chunksize : int = CHUNK_SIZE):
+    
+    """
+    Read the UiPath workbook in chunks
+    ---------------------------
+    This method opens the workbook once in
+    read-only mode and streams the rows of all
+    the wanted sheets, keeping only the columns
+    used for the output.
+
+    Parameters
+    ----------
+    path : str
+        Path of the workbook generated by UiPath
+    sheet_names : list
+        Sheets to read, one per Zillow category
+    chunksize : int
+        Number of rows per chunk
+        
+    Yields
+    ------
+    pd.DataFrame
+        Rows of one sheet with a Category
+        column holding the sheet name
+    """
+    
+    def make_chunk(rows, sheetname):
+        chunk = pd.DataFrame(rows, columns=list(UIPATH_COLUMNS)).astype(UIPATH_COLUMNS)
+        return chunk.assign(Category=sheetname)
+    
+    # the robot may still be saving the workbook
+    workbook = open_workbook(path)
+    
+    try:
+        for sheetname in sheet_names:
+            
+            rows = workbook[sheetname].iter_rows(values_only=True)
+            
+            # position of the wanted columns in the header row
+            header = list(next(rows, ()))
+            positions = [header.index(column) for column in UIPATH_COLUMNS]
+            
+            chunk = []
+            for row in rows:
+                
+                values = [row[position] if position < len(row) else None for position in positions]
+                
+                # skip empty rows
+                if all(value is None for value in values):
+                    continue
+                
+                chunk.append(values)
+                
+                if len(chunk) == chunksize:
+                    yield make_chunk(chunk, sheetname)
+                    chunk = []
+                    
+            if chunk:
+                yield make_chunk(chunk, sheetname)
+                
+    finally:
+        workbook.close()
+
+def clean_zillow_frame(df : pd.DataFrame):
+    
+    """
+    Clean the scraped Zillow records
+    ---------------------------
+    This method cleans the house features and
+    splits the address into address, state and
+    zipcode for all the rows at once.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Records from the UiPath workbook with a
+        Category column holding the sheet name
+        
+    """
+    
+    # clean the extracted house features
+    raw_features = df["House Features"].str.split("-").str[0].str.strip()
+    features = raw_features.str.replace(r"([A-Za-z]+)", r" \1 ", regex=True).str.replace("  ", " ", regex=False)
+    
+    # clean the extracted address related fields
+    raw_address = df["Address"].astype(str)
+    address = raw_address.str.extract(r"(?s)^(.*),", expand=False).fillna("")
+    
+    # clean the extracted zipcode and state fields
+    parts = raw_address.str.extract(STATE_ZIPCODE_REGEX)
+    is_zipcode = parts["last"].str.isnumeric().fillna(False).astype(bool)
+    state = parts["second"].where(is_zipcode, parts["third"])
+    zipcode = parts["last"].where(is_zipcode, parts["second"] + " " + parts["last"])
+    
+    return pd.DataFrame({
+        "Category": df["Category"],
+        "House Features": features,
+        "Address": address,
+        "State": state,
+        "Zipcode": zipcode,
+        "Price": df["Price"],
+        "URL": df["URL"],
+    }, columns=OUTPUT_COLUMNS)
+    
+class ListingIndex:
+    
+    """
+    Index of the seen Zillow listings
+    ---------------------------
+    This class keeps every listing seen by earlier
+    runs in a SQLite file, keyed by its URL, with a
+    hash of its scraped record. Only listings that
+    are new or whose record changed (price change,
+    sale to sold move, ...) are cleaned and stored
+    again.
+
+    Parameters
+    ----------
+    path : str
+        SQLite file of the index
+    """
+    
+    def __init__(self, path : str = LISTING_INDEX_PATH):
+        self._db = sqlite3.connect(path)
+        
+        with self._db:
+            self._db.execute("""CREATE TABLE IF NOT EXISTS listings (
+                url TEXT PRIMARY KEY,
+                record_hash TEXT NOT NULL,
+                category TEXT,
+                features TEXT,
+                address TEXT,
+                state TEXT,
+                zipcode TEXT,
+                price TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL)""")
+            
+    def _known(self, urls : list):
+        
+        """
+        Stored hash, category and price of the
+        given URLs that are in the index.
+        """
+        
+        known = {}
+        
+        # stay under the SQLite parameter limit
+        for start in range(0, len(urls), 500):
+            batch = urls[start:start+500]
+            query = f"SELECT url, record_hash, category, price FROM listings WHERE url IN ({','.join('?' * len(batch))})"
+            for url, record_hash, category, price in self._db.execute(query, batch):
+                known[url] = (record_hash, category, price)
+                
+        return known
+    
+    def update(self, chunk : pd.DataFrame):
+        
+        """
+        Add a chunk of scraped records to the index
+        ---------------------------
+        Parameters
+        ----------
+        chunk : pd.DataFrame
+            Raw records from `read_uipath_workbook`
+
+        Returns
+        -------
+        pd.DataFrame
+            Cleaned new and changed records with
+            their Status and previous values
+        """
+        
+        # the last record of a listing wins
+        chunk = chunk.drop_duplicates("URL", keep="last")
+        
+        # hash of every raw record
+        record_hashes = pd.util.hash_pandas_object(chunk[["Category"] + list(UIPATH_COLUMNS)].astype(str), index=False).map("{:016x}".format)
+        
+        known = self._known(chunk["URL"].astype(str).tolist())
+        stored = chunk["URL"].astype(str).map(lambda url: known.get(url, (None, None, None)))
+        stored_hashes = stored.str[0]
+        
+        # only new and changed records are cleaned
+        is_changed = (stored_hashes != record_hashes).to_numpy()
+        delta = clean_zillow_frame(chunk[is_changed])
+        delta.insert(0, "Status", stored_hashes[is_changed].isna().map({True: "new", False: "changed"}))
+        delta["Previous Category"] = stored[is_changed].str[1]
+        delta["Previous Price"] = stored[is_changed].str[2]
+        
+        now = time.time()
+        
+        with self._db:
+            
+            # store the new and changed records
+            self._db.executemany("""INSERT INTO listings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET record_hash = excluded.record_hash, category = excluded.category,
+                features = excluded.features, address = excluded.address, state = excluded.state,
+                zipcode = excluded.zipcode, price = excluded.price, last_seen = excluded.last_seen""", [
+                (str(row.URL), record_hash, row.Category, *[None if pd.isna(value) else str(value) for value in (row[2], row.Address, row.State, row.Zipcode, row.Price)], now, now)
+                for row, record_hash in zip(delta.itertuples(index=False, name="Row"), record_hashes[is_changed])])
+            
+            # mark the unchanged records as seen
+            self._db.executemany("UPDATE listings SET last_seen = ? WHERE url = ?",
+                [(now, str(url)) for url in chunk["URL"][~is_changed]])
+            
+        return delta
+    
+    def snapshot(self):
+        
+        """
+        All the listings in the index, in the
+        columns of the final output.
+        """
+        
+        rows = self._db.execute("SELECT category, features, address, state, zipcode, price, url FROM listings ORDER BY first_seen, rowid").fetchall()
+        return pd.DataFrame(rows, columns=OUTPUT_COLUMNS)
+    
+    def close(self):
+        self._db.close()
+
+def create_final_output_excel(results : list, output_path : str = "output.xlsx", columns : list = OUTPUT_COLUMNS):
     
     """
     Generate the output excel from DF
@@ -44,76 +479,128 @@ def create_final_output_excel(results : list):
     ----------
     results : list
         It is a list of all the results
+    output_path : str
+        Excel file to write
+    columns : list
+        Columns of the results
         
     """
     
     # create a dataframe
-    df = pd.DataFrame(results, columns =["Category", "House Features", "Address", "State", "Zipcode", "Price", "URL"])
+    df = pd.DataFrame(results, columns =columns)
 
     # create an excel file for the output
-    df.to_excel("output.xlsx", index=False,)
+    df.to_excel(output_path, index=False,)
+    
+def create_final_output(results : list, output_format : str = "excel", name : str = "output", columns : list = OUTPUT_COLUMNS):
+    
+    """
+    Generate the output file from DF
+    ---------------------------
+    This method accepts a list of results
+    and writes them in the chosen format.
+    Only the Excel format is limited to
+    32,767 characters per cell.
+
+    Parameters
+    ----------
+    results : list
+        It is a list of all the results
+    output_format : str
+        One of "excel", "csv", "jsonl", "parquet"
+    name : str
+        Output file name without extension
+    columns : list
+        Columns of the results
+        
+    """
+    
+    # output file
+    output_path = f"{name}.{OUTPUT_FORMATS[output_format]}"
+    
+    if output_format == "excel":
+        create_final_output_excel(results, output_path, columns)
+        return
+    
+    # create a dataframe
+    df = pd.DataFrame(results, columns =columns)
+    
+    if output_format == "csv":
+        df.to_csv(output_path, index=False,)
+    elif output_format == "jsonl":
+        df.to_json(output_path, orient="records", lines=True, force_ascii=False)
+    else:
+        df.to_parquet(output_path, index=False,)
     
     
 if __name__ == "__main__":
     
+    # command line options
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output-format", choices=list(OUTPUT_FORMATS), default="excel")
+    parser.add_argument("--incremental", action="store_true", help="only process new and changed listings")
+    parser.add_argument("--index-path", default=LISTING_INDEX_PATH, help="listing index of the incremental mode")
+    parser.add_argument("--robot-command", default=UIPATH_COMMAND, help="command that runs the UiPath robot")
+    parser.add_argument("--robot-timeout", type=float, default=UIPATH_TIMEOUT, help="seconds the robot may run")
+    parser.add_argument("--skip-robot", action="store_true", help="only process the existing workbook")
+    parser.add_argument("--uipath-excel", default=UIPATH_EXCEL_PATH, help="workbook written by the robot")
+    args = parser.parse_args()
+    
     # script logging
     logger = create_logging()
     
     logger.info("Scraping the FOR-SALE, FOR-RENT and SOLD categories from Zillow with pagination...")
     
-    # srape from zillow website
-    zillow_scraper_uipath()
-    
-    logger.info("Records scraped successfully, creating the final output file...")
-
     # excel file with records scraped via UiPath
-    ui_path_excel_path = "C:\\Users\\aditya.k\\.nuget\\packages\\zillowscraper\\1.0.1\\content\\Project_Notebook.xlsx"
+    ui_path_excel_path = args.uipath_excel
+    
+    # last save of the workbook of an earlier run, its sheets are not results of this run
+    last_saved = None if args.skip_robot else workbook_mtime(ui_path_excel_path)
+    
+    # srape from zillow website in the background
+    robot = None if args.skip_robot else zillow_scraper_uipath(args.robot_command)
     
     # all possible categories in Zillow/ sheet name in excel
     sheet_names_list = ["sale", "sold", "rent"]
     
-    # final result list declared
-    results = list()
+    # records of the excel file generated form UiPath, read chunk by chunk
+    # as soon as the robot has finished a sheet, the sheets left when the
+    # robot stops are read in one pass of the workbook
+    chunks = (chunk for sheets in finished_sheets(ui_path_excel_path, sheet_names_list, robot, args.robot_timeout, since=last_saved)
+              for chunk in read_uipath_workbook(ui_path_excel_path, sheets))
     
-    # iterate through all the excel sheets
-    for sheetname in sheet_names_list:
+    # only process the listings that changed since the last run
+    if args.incremental:
         
-        # read the excel file generated form UiPath
-        df = pd.read_excel(ui_path_excel_path, sheet_name = sheetname)
+        index = ListingIndex(args.index_path)
         
-        # iterate through all the rows in the excel file
-        for idx, row in df.iterrows():
+        try:
+            delta_chunks = [index.update(chunk) for chunk in chunks]
+            delta = pd.concat(delta_chunks, ignore_index=True) if delta_chunks else pd.DataFrame(columns=DELTA_COLUMNS)
             
-            # zillow categories
-            category = sheetname
+            # a listing in several chunks is reported once with its first status
+            first_status = delta.groupby("URL", sort=False)["Status"].first()
+            delta = delta.drop_duplicates("URL", keep="last")
+            delta["Status"] = delta["URL"].map(first_status)
             
-            # clean the extracted house features
-            raw_features = str(row["House Features"].split("-")[0]).lstrip().rstrip()
-            features = str(re.sub("[A-Za-z]+", lambda ele: " " + ele[0] + " ", raw_features)).replace("  ", " ")
+            # generate the delta and the merged snapshot
+            create_final_output(delta, args.output_format, "output_delta", DELTA_COLUMNS)
+            create_final_output(index.snapshot(), args.output_format)
             
-            # clean the extracted address related fields
-            raw_address = str(row["Address"]).split()
-            address = ",".join(str(row["Address"]).split(",")[:-1])
-            
-            # clean the extracted zipcode and state fields
-            if str(raw_address[-1]).isnumeric():
-                state = str(raw_address[-2])
-                zipcode = str(raw_address[-1])
-            else:
-                state = str(raw_address[-3])
-                zipcode = " ".join(raw_address[-2:] )       
-                    
-            # URL of the property
-            url = row["URL"]
+        finally:
+            index.close()
             
-            # price of the property
-            price = row["Price"]
-            
-            # store cleaned results to the final list
-            results.append((category, features, address, state, zipcode, price, url))
+        logger.info(f"{len(delta)} new or changed listings written to the delta output")
+        
+    else:
+        
+        # clean all the records
+        cleaned_chunks = [clean_zillow_frame(chunk) for chunk in chunks]
+        
+        # all the categories in one dataframe
+        results = pd.concat(cleaned_chunks, ignore_index=True) if cleaned_chunks else pd.DataFrame(columns=OUTPUT_COLUMNS)
 
-    # generate the final output file
-    create_final_output_excel(results)
+        # generate the final output file
+        create_final_output(results, args.output_format)
     
     logger.info("Final output generated successfully!")
-    
\ No newline at end of file